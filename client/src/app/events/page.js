@@ -14,22 +14,9 @@ import {
 } from "lucide-react"; // Added AlertTriangle and Loader2
 
 export default function EventsPage() {
-  const { events: allEvents, loading, error } = useEvents(); // Use the hook
-
-  const today = new Date();
-  today.setHours(0, 0, 0, 0); // Normalize today
-
-  // Past events calculation will happen after loading and error checks
-  let pastEvents = [];
-  if (!loading && !error) {
-    pastEvents = allEvents.filter((event) => {
-      const eventDate = new Date(event.date);
-      eventDate.setHours(0, 0, 0, 0); // Normalize event date
-      return eventDate < today;
-    });
-    // Sort past events by date, most recent first
-    pastEvents.sort((a, b) => new Date(b.date) - new Date(a.date));
-  }
+  // Past events, most recent first, filtered and sorted by the API
+  const { events, loading, error } = useEvents({ past: true, sort: "-date" });
+  const pastEvents = !loading && !error ? events : [];
 
   return (
     <div className="flex flex-col min-h-screen">
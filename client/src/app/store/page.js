@@ -1,8 +1,9 @@
 "use client";
 
-import React, { useState } from "react";
+import React, { useRef, useState } from "react";
 import { Button } from "@/components/ui/button";
 import { useProducts } from "@/data/Products"; // Updated import to use the hook
+import { newIdempotencyKey, ordersAPI } from "@/data/Orders";
 
 import Modal from "@/components/Modal/PurchaseModal";
 import ProductCard from "@/components/store/ProductCard";
@@ -11,8 +12,6 @@ import emailjs from "@emailjs/browser";
 import Loading from "@/app/store/loading"
 import Error from "@/app/store/error"
 
-const apiUrl  = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8080";
-
 export default function Store() {
   // Use the custom hook for products data
   const { products, loading, error, refreshProducts } = useProducts();
@@ -28,6 +27,8 @@ export default function Store() {
     email: "",
     phone: "",
   });
+  // Idempotency key of the last order sent, reused while its payload is unchanged
+  const pendingOrder = useRef({ body: null, key: null });
 
   const openModal = (product) => {
     setSelectedProduct(product);
@@ -65,22 +66,15 @@ export default function Store() {
       total_amount: parseFloat((selectedProduct.price * quantity).toFixed(2)),
     };
 
+    const body = JSON.stringify(orderPayload);
+    if (pendingOrder.current.body !== body) {
+      pendingOrder.current = { body, key: newIdempotencyKey() };
+    }
+
     try {
-      // 1. Send order to backend
-      const response = await fetch(`${apiUrl }/orders`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify(orderPayload),
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(
-          errorData.detail || `HTTP error! status: ${response.status}`
-        );
-      }
+      // 1. Send order to backend; retried with backoff under the same key,
+      // so a resubmit after a timeout cannot create a second order
+      await ordersAPI.createOrder(orderPayload, pendingOrder.current.key);
 
       // Backend call successful, now proceed with EmailJS
       // EmailJS template parameters
@@ -117,6 +111,7 @@ export default function Store() {
         orderPayload
       );
       setFormData({ name: "", email: "", phone: "" });
+      pendingOrder.current = { body: null, key: null };
     } catch (error) {
       console.error("Order submission failed:", error);
       setSubmitError(
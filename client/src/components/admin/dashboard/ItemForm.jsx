@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import { Save, X, Upload, Link as LinkIcon } from "lucide-react"; // Renamed Link to LinkIcon to avoid conflict
+import { imagesAPI } from "@/data/Images";
 
 const ItemForm = ({ type, item, onSave, onCancel, loading }) => {
   const [formData, setFormData] = useState(item || getDefaultFormData(type));
@@ -108,27 +109,19 @@ const ItemForm = ({ type, item, onSave, onCancel, loading }) => {
   const handleFileUpload = async (file) => {
     if (!file) return;
 
-    // For simplicity, using Data URL for preview.
-    // In a real app, you'd upload to a server and get back a URL.
+    const imageField = type === "projects" ? "mainImageUrl" : "imageUrl";
+    // Show the local file right away; the server URL replaces it once stored
+    const localPreview = URL.createObjectURL(file);
+    setImagePreview(localPreview);
     try {
-      const reader = new FileReader();
-      reader.onload = (e) => {
-        const dataUrl = e.target.result;
-        const imageField = type === "projects" ? "mainImageUrl" : "imageUrl";
-        handleChange(imageField, dataUrl); // Store Data URL or actual URL from server
-        setImagePreview(dataUrl);
-      };
-      reader.readAsDataURL(file);
-      // Example: If you were to upload
-      // const uploadFormData = new FormData();
-      // uploadFormData.append('image', file);
-      // const response = await fetch('/api/upload', { method: 'POST', body: uploadFormData });
-      // const result = await response.json();
-      // handleChange(imageField, result.imageUrl);
-      // setImagePreview(result.imageUrl);
+      const result = await imagesAPI.upload(file);
+      handleChange(imageField, result.url);
+      setImagePreview(result.url);
     } catch (error) {
       console.error("Error uploading file:", error);
-      // Handle error (e.g., show a notification)
+      setImagePreview(formData[imageField] || null);
+    } finally {
+      URL.revokeObjectURL(localPreview);
     }
   };
 
@@ -265,7 +258,7 @@ const ItemForm = ({ type, item, onSave, onCancel, loading }) => {
                       className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                     />
                     <p className="text-xs text-gray-500 mt-1">
-                      Supported formats: JPG, PNG, GIF (Max 5MB)
+                      Supported formats: JPG, PNG, GIF, WebP (Max 10MB)
                     </p>
                   </div>
                 )}
@@ -466,7 +459,7 @@ const ItemForm = ({ type, item, onSave, onCancel, loading }) => {
                       className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                     />
                     <p className="text-xs text-gray-500 mt-1">
-                      Supported formats: JPG, PNG, GIF (Max 5MB)
+                      Supported formats: JPG, PNG, GIF, WebP (Max 10MB)
                     </p>
                   </div>
                 )}
@@ -593,7 +586,7 @@ const ItemForm = ({ type, item, onSave, onCancel, loading }) => {
                       className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                     />
                     <p className="text-xs text-gray-500 mt-1">
-                      Supported formats: JPG, PNG, GIF (Max 5MB)
+                      Supported formats: JPG, PNG, GIF, WebP (Max 10MB)
                     </p>
                   </div>
                 )}
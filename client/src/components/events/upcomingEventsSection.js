@@ -11,7 +11,12 @@ export default function UpcomingEventsSection({
   containerClass = "container mx-auto px-4 py-12 mb-8",
   variant = "default",
 }) {
-  const { events: allEvents, loading, error } = useEvents(); // Use the hook
+  // The API returns only upcoming events, soonest first, up to maxEvents
+  const { events: upcomingEvents, loading, error } = useEvents({
+    upcoming: true,
+    sort: "date",
+    limit: maxEvents || 100,
+  });
 
   if (loading) {
     return (
@@ -70,23 +75,6 @@ export default function UpcomingEventsSection({
     );
   }
 
-  const today = new Date();
-  today.setHours(0, 0, 0, 0); // Normalize today to the start of the day
-
-  let upcomingEvents = allEvents.filter((event) => {
-    const eventDate = new Date(event.date);
-    eventDate.setHours(0, 0, 0, 0); // Normalize event date
-    return eventDate >= today;
-  });
-
-  // Sort upcoming events by date, soonest first
-  upcomingEvents.sort((a, b) => new Date(a.date) - new Date(b.date));
-
-  // Limit events if maxEvents is specified
-  if (maxEvents) {
-    upcomingEvents = upcomingEvents.slice(0, maxEvents);
-  }
-
   return (
     <section className={containerClass}>
       {showHeader && (
@@ -7,9 +7,13 @@ const apiUrl  = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8080";
 
 // API service for events
 export const eventsAPI = {
-  getEvents: async () => {
+  // params: { upcoming, past, from, to, location, sort, limit }, all optional
+  getEvents: async (params = {}) => {
     try {
-      const response = await fetch(`${apiUrl }/events`);
+      const query = new URLSearchParams(
+        Object.entries(params).filter(([, value]) => value != null)
+      ).toString();
+      const response = await fetch(`${apiUrl }/events/${query ? `?${query}` : ""}`);
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
@@ -28,8 +32,9 @@ export const eventsAPI = {
   // deleteEvent: async (id) => { /* ... */ },
 };
 
-// React Hook for managing events data
-export const useEvents = () => {
+// React Hook for managing events data; params are passed to the API so
+// filtering, sorting and limiting happen on the server
+export const useEvents = (params = {}) => {
   const [events, setEvents] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -44,17 +49,19 @@ export const useEvents = () => {
     return eventDate >= today ? "upcoming" : "past";
   };
 
-  // Fetch events on component mount
+  const paramsKey = JSON.stringify(params);
+
+  // Fetch events on mount and whenever the query changes
   useEffect(() => {
     fetchEventsInternal(); // Renamed for clarity, or ensure it calls the inner function
-  }, []);
+  }, [paramsKey]);
 
   // Renamed inner function to avoid confusion with the potentially previously exported one
   const fetchEventsInternal = async () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await eventsAPI.getEvents();
+      const data = await eventsAPI.getEvents(params);
 
       // Transform the data to match your existing structure and calculate status
       const transformedEvents = data.map((event) => ({
@@ -0,0 +1,23 @@
+"use client"; // Mark this file as a Client Component
+
+const apiUrl  = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8080";
+
+export const imagesAPI = {
+  // Upload an image file; resolves to { id, url, variants } where url goes
+  // into the item's image field and variants maps widths to WebP URLs
+  upload: async (file) => {
+    const formData = new FormData();
+    formData.append("file", file);
+    const response = await fetch(`${apiUrl }/images/`, {
+      method: "POST",
+      body: formData,
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(
+        errorData.detail || `HTTP error! status: ${response.status}`
+      );
+    }
+    return response.json();
+  },
+};
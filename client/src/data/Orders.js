@@ -0,0 +1,58 @@
+"use client"; // Mark this file as a Client Component
+
+const apiUrl  = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8080";
+
+const MAX_ATTEMPTS = 4;
+const BASE_DELAY_MS = 500;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Network errors, 429 and 5xx may not have reached the database, or may
+// have; resending is safe because the server deduplicates by Idempotency-Key
+const isRetryable = (status) => status === 429 || status >= 500;
+
+// One key per distinct order: retrying the same payload reuses it, so the
+// server returns the first order instead of creating another
+export const newIdempotencyKey = () =>
+  typeof crypto !== "undefined" && crypto.randomUUID
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+export const ordersAPI = {
+  createOrder: async (order, idempotencyKey) => {
+    let lastError;
+    for (let attempt = 0; attempt < MAX_ATTEMPTS; attempt++) {
+      if (attempt > 0) {
+        // Exponential backoff with jitter, honouring Retry-After when sent
+        await sleep(lastError.retryAfter ?? BASE_DELAY_MS * 2 ** (attempt - 1) * (0.5 + Math.random()));
+      }
+      let response;
+      try {
+        response = await fetch(`${apiUrl }/orders/`, {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            "Idempotency-Key": idempotencyKey,
+          },
+          body: JSON.stringify(order),
+        });
+      } catch (error) {
+        lastError = error;
+        continue;
+      }
+      if (response.ok) {
+        return response.json();
+      }
+      const errorData = await response.json().catch(() => ({}));
+      lastError = new Error(
+        errorData.detail || `HTTP error! status: ${response.status}`
+      );
+      if (!isRetryable(response.status)) {
+        throw lastError;
+      }
+      const retryAfter = Number(response.headers.get("Retry-After"));
+      lastError.retryAfter = retryAfter > 0 ? retryAfter * 1000 : undefined;
+    }
+    throw lastError;
+  },
+};
@@ -162,6 +162,47 @@ export const projectsAPI = {
     }
   },
 
+  // Create a project together with its sections in one request
+  createProjectTree: async (projectData) => {
+    try {
+      const response = await fetch(`${apiUrl }/projects/tree`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify(projectData),
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return await response.json();
+    } catch (error) {
+      console.error("Error creating project tree:", error);
+      throw error;
+    }
+  },
+
+  // Replace a project and its full section list; sections without an id are
+  // created and stored ones left out are deleted
+  replaceProjectTree: async (id, projectData) => {
+    try {
+      const response = await fetch(`${apiUrl }/projects/${id}/tree`, {
+        method: "PUT",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify(projectData),
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return await response.json();
+    } catch (error) {
+      console.error(`Error replacing project tree ${id}:`, error);
+      throw error;
+    }
+  },
+
   // Create project section
   createProjectSection: async (projectId, sectionData) => {
     try {
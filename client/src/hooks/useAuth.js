@@ -18,18 +18,72 @@ export const useAuth = () => {
     return null;
   };
 
-  const setStoredToken = (token) => {
+  const removeStoredToken = () => {
     if (typeof window !== "undefined") {
-      localStorage.setItem("admin_token", token);
+      localStorage.removeItem("admin_token");
+      localStorage.removeItem("admin_refresh_token");
+      localStorage.removeItem("admin_user");
     }
   };
 
-  const removeStoredToken = () => {
+  const storeSession = (data) => {
     if (typeof window !== "undefined") {
-      localStorage.removeItem("admin_token");
+      localStorage.setItem("admin_token", data.access_token);
+      localStorage.setItem("admin_refresh_token", data.refresh_token);
+      localStorage.setItem("admin_user", JSON.stringify(data.user));
     }
   };
 
+  const getStoredUser = () => {
+    if (typeof window !== "undefined") {
+      try {
+        return JSON.parse(localStorage.getItem("admin_user"));
+      } catch {
+        return null;
+      }
+    }
+    return null;
+  };
+
+  // Milliseconds since epoch at which the token expires, read from its claims
+  const tokenExpiry = (token) => {
+    try {
+      const payload = token.split(".")[1].replace(/-/g, "+").replace(/_/g, "/");
+      return JSON.parse(atob(payload)).exp * 1000;
+    } catch {
+      return 0;
+    }
+  };
+
+  // Treat tokens that expire within the next 30 seconds as already expired
+  const isFresh = (token) => tokenExpiry(token) > Date.now() + 30000;
+
+  const refreshSession = async () => {
+    const refreshToken =
+      typeof window !== "undefined"
+        ? localStorage.getItem("admin_refresh_token")
+        : null;
+    if (!refreshToken || !isFresh(refreshToken)) {
+      throw new Error("Session expired");
+    }
+
+    const response = await fetch(`${API_BASE}/users/refresh`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+
+    if (!response.ok) {
+      throw new Error("Session expired");
+    }
+
+    const data = await response.json();
+    storeSession(data);
+    return data;
+  };
+
   const verifyToken = async (token) => {
     try {
       const response = await fetch(`${API_BASE}/users/verify`, {
@@ -69,8 +123,8 @@ export const useAuth = () => {
 
       const data = await response.json();
 
-      // Store token
-      setStoredToken(data.access_token);
+      // Store tokens
+      storeSession(data);
 
       // Set user data
       setUser(data.user);
@@ -94,20 +148,37 @@ export const useAuth = () => {
   };
 
   const makeAuthenticatedRequest = async (url, options = {}) => {
-    const token = getStoredToken();
+    let token = getStoredToken();
     if (!token) {
       logout();
       throw new Error("No authentication token");
     }
 
-    const headers = {
-      Authorization: `Bearer ${token}`,
-      "Content-Type": "application/json",
-      ...options.headers,
-    };
+    const send = (accessToken) =>
+      fetch(url, {
+        ...options,
+        headers: {
+          Authorization: `Bearer ${accessToken}`,
+          "Content-Type": "application/json",
+          ...options.headers,
+        },
+      });
 
     try {
-      const response = await fetch(url, { ...options, headers });
+      if (!isFresh(token)) {
+        token = (await refreshSession()).access_token;
+      }
+
+      let response = await send(token);
+
+      if (response.status === 401) {
+        // The access token may have been rejected just before expiry; retry once
+        try {
+          response = await send((await refreshSession()).access_token);
+        } catch {
+          // fall through to logout below
+        }
+      }
 
       if (response.status === 401) {
         logout();
@@ -136,8 +207,15 @@ export const useAuth = () => {
       }
 
       try {
-        const userData = await verifyToken(token);
-        setUser(userData.user);
+        // A fresh token and the user stored at login need no round trip;
+        // an expired token is renewed with the refresh token instead
+        let currentUser = getStoredUser();
+        if (!isFresh(token)) {
+          currentUser = (await refreshSession()).user;
+        } else if (!currentUser) {
+          currentUser = (await verifyToken(token)).user;
+        }
+        setUser(currentUser);
         setIsAuthenticated(true);
         setError(null);
       } catch (error) {
@@ -0,0 +1,152 @@
+import atexit
+import hashlib
+import logging
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.config import settings
+
+ALGORITHM = "HS256"
+ACCESS = "access"
+REFRESH = "refresh"
+
+# Auth events are handed to a background thread so formatting and writing a
+# log line never blocks the request that produced it
+logger = logging.getLogger("app.auth")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+def log_event(event: str, sampled: bool = True, level: int = logging.INFO, **fields):
+    """
+    Log one auth event as key=value pairs.
+
+    Routine events are only written for AUTH_LOG_SAMPLE_RATE of calls;
+    pass sampled=False for events that should always be recorded.
+    """
+    if sampled and random.random() >= settings.AUTH_LOG_SAMPLE_RATE:
+        return
+    logger.log(level, " ".join(
+        [f"event={event}"] + [f"{key}={value}" for key, value in fields.items()]))
+
+
+class InvalidToken(Exception):
+    """Raised when a token is malformed, expired or of the wrong type."""
+
+
+class TokenCache:
+    """
+    Bounded LRU of already validated tokens, keyed by a digest of the token.
+
+    Each entry is dropped once its token expires, so a hit never outlives
+    the token it stands for.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token: str, claims: dict):
+        if self.max_entries <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims["exp"], claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+
+
+# python-jose (and the cryptography backend it loads) is imported inside the
+# functions below, so it is only paid for by requests that handle tokens
+def _encode(user, token_type: str, expires_delta: timedelta) -> str:
+    from jose import jwt
+
+    claims = {
+        "sub": user.email,
+        "user_id": user.id,
+        "name": user.name,
+        "type": token_type,
+        "exp": datetime.utcnow() + expires_delta,
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_token_pair(user) -> dict:
+    """Issue an access token and the refresh token used to renew it."""
+    access_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": _encode(user, ACCESS, access_expires),
+        "refresh_token": _encode(user, REFRESH, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)),
+        "token_type": "bearer",
+        "expires_in": int(access_expires.total_seconds()),
+    }
+
+
+def decode_token(token: str, token_type: str = ACCESS) -> dict:
+    """Validate a token and return its claims, using the cache when possible."""
+    claims = token_cache.get(token)
+    cached = claims is not None
+    if claims is None:
+        from jose import JWTError, jwt
+
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            log_event("token_rejected", sampled=False, level=logging.WARNING, reason=type(e).__name__)
+            raise InvalidToken() from e
+        if claims.get("user_id") is None or "exp" not in claims:
+            log_event("token_rejected", sampled=False, level=logging.WARNING, reason="missing_claims")
+            raise InvalidToken()
+        token_cache.set(token, claims)
+    # Tokens issued before refresh tokens existed carry no type; treat them as access tokens
+    if claims.get("type", ACCESS) != token_type:
+        log_event("token_rejected", sampled=False, level=logging.WARNING, reason="wrong_type")
+        raise InvalidToken()
+    log_event("token_verified", user_id=claims["user_id"], type=token_type, cached=cached)
+    return claims
@@ -0,0 +1,33 @@
+from typing import Any, List, Tuple
+
+from pydantic import ValidationError
+
+from app import schemas
+
+
+def validate_items(raw_items: List[Any], schema, **overrides) -> Tuple[list, List[schemas.BulkItemError]]:
+    """
+    Validate each element of a bulk request on its own.
+
+    Returns the valid items as (index, model) pairs and one error per invalid
+    element, so a single bad row does not reject the whole batch.
+    """
+    valid, errors = [], []
+    for index, raw in enumerate(raw_items):
+        if not isinstance(raw, dict):
+            errors.append(schemas.BulkItemError(index=index, detail="Item must be an object"))
+            continue
+        try:
+            valid.append((index, schema.model_validate({**raw, **overrides})))
+        except ValidationError as exc:
+            errors.append(schemas.BulkItemError(
+                index=index, id=raw.get("id") if isinstance(raw.get("id"), int) else None,
+                detail=exc.errors(include_url=False, include_context=False)))
+    return valid, errors
+
+
+def missing_id_errors(valid: list, missing_ids: List[int], detail: str) -> List[schemas.BulkItemError]:
+    """Errors for validated items whose id did not match a row."""
+    missing = set(missing_ids)
+    return [schemas.BulkItemError(index=index, id=item.id, detail=detail)
+            for index, item in valid if item.id in missing]
@@ -0,0 +1,209 @@
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.projection import projection_adapter
+
+
+class CacheBackend:
+    """
+    Storage used by ListingCache.
+
+    Entries are JSON-compatible values. Namespaces carry a generation counter
+    that is part of every key, so invalidating a namespace is a single bump
+    instead of a scan over its keys.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    def generation(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def bump(self, namespace: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process TTL + LRU store. Each serverless instance keeps its own copy."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}  # never evicted, unlike entries
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            return self._generations[namespace]
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared store for multi-instance deployments; requires the redis package."""
+
+    def __init__(self, url: str, prefix: str = "iiec:cache:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def generation(self, namespace):
+        raw = self._client.get(f"{self._prefix}gen:{namespace}")
+        return int(raw) if raw is not None else 0
+
+    def bump(self, namespace):
+        return int(self._client.incr(f"{self._prefix}gen:{namespace}"))
+
+
+def build_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.CACHE_URL)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unknown CACHE_BACKEND '{settings.CACHE_BACKEND}'")
+
+
+class ListingCache:
+    """Read-through cache for serialized listing pages, keyed by namespace and call arguments."""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def key(self, namespace: str, args: tuple, kwargs: dict) -> str:
+        params = ":".join([repr(a) for a in args] + [f"{k}={kwargs[k]!r}" for k in sorted(kwargs)])
+        return f"{namespace}:{self.backend.generation(namespace)}:{params}"
+
+    def get(self, key: str):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+listing_cache = ListingCache(build_backend(), settings.CACHE_TTL)
+
+
+def cached_listing(namespace: str, schema):
+    """
+    Cache a crud listing function as JSON-ready dicts shaped by `schema`.
+
+    The wrapped function returns those dicts instead of ORM objects, on hits
+    and misses alike, so routers can return them straight to FastAPI. A
+    `projection` keyword narrows the dicts to the projected fields.
+    """
+    full_adapter = TypeAdapter(List[schema])
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            key = listing_cache.key(namespace, args, kwargs)
+            if listing_cache.enabled:
+                cached = listing_cache.get(key)
+                if cached is not None:
+                    return cached
+            projection = kwargs.get("projection")
+            adapter = full_adapter if projection is None else projection_adapter(schema, projection)
+            rows = adapter.dump_python(
+                adapter.validate_python(fn(db, *args, **kwargs), from_attributes=True),
+                mode="json")
+            if listing_cache.enabled:
+                listing_cache.set(key, rows)
+            return rows
+        return wrapper
+    return decorator
+
+
+def cached_fingerprint(namespace: str):
+    """
+    Cache a crud function that summarises a namespace (counts, timestamps).
+
+    Stored under the namespace generation like listings, so the summary is
+    dropped by the same writes that drop the pages it describes.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(db):
+            version = listing_cache.backend.generation(namespace)
+            key = f"{namespace}:{version}:fingerprint"
+            if listing_cache.enabled:
+                cached = listing_cache.get(key)
+                if cached is not None:
+                    return cached
+            value = fn(db)
+            if listing_cache.enabled:
+                listing_cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidate(*namespaces: str):
+    """Drop every cached page of the given namespaces after a write."""
+    listing_cache.invalidate(*namespaces)
@@ -0,0 +1,208 @@
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip is offered without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Bodies above this are compressed in the threadpool instead of on the event loop
+THREADPOOL_BYTES = 256 * 1024
+
+
+def uncompressed(endpoint):
+    """
+    Route decorator opting an endpoint out of response compression, e.g.
+    for responses carrying secrets next to request-controlled data (BREACH).
+    """
+    endpoint.compress = False
+    return endpoint
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding we support from an Accept-Encoding header, by q-value; br wins ties."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[name.strip().lower()] = q
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda name: offered.get(name, offered.get("*", 0.0)))
+    return best if offered.get(best, offered.get("*", 0.0)) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressedBodies:
+    """
+    LRU of compressed bodies keyed by (ETag, encoding, length), bounded by
+    total bytes. A listing or item served again with the same ETag (from
+    the listing cache, or re-rendered from unchanged rows) is identical, so
+    its compressed forms are reused instead of recomputed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, int], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compressed = {"br": 0, "gzip": 0}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def record(self, encoding: str, size_in: int, size_out: int, seconds: float = 0.0):
+        with self._lock:
+            self.compressed[encoding] += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+            self.seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.COMPRESSION_ENABLED,
+                "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+                "min_size": settings.COMPRESSION_MIN_SIZE,
+                "responses": dict(self.compressed),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+                "compress_seconds_total": round(self.seconds, 6),
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_entries": len(self._entries),
+                "cache_bytes": self._bytes,
+            }
+
+
+compressed_bodies = CompressedBodies(settings.COMPRESSION_CACHE_BYTES)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli for responses that declare a Content-Length of at least
+    COMPRESSION_MIN_SIZE. Streamed responses (exports) have no
+    Content-Length and pass through untouched, as do endpoints marked with
+    @uncompressed and bodies that are already encoded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _eligible(scope, message) -> bool:
+        if message["status"] != 200 or getattr(scope.get("endpoint"), "compress", True) is False:
+            return False
+        headers = {k.lower(): v for k, v in message.get("headers", [])}
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get(b"content-length")
+        return length is not None and int(length) >= settings.COMPRESSION_MIN_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                if self._eligible(scope, message):
+                    start = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = await self._compress(start, b"".join(chunks), encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    async def _compress(start, body: bytes, encoding: str) -> bytes:
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"content-length", b"vary")]
+        vary = [v for k, v in start.get("headers", []) if k.lower() == b"vary"]
+        etag = next((v for k, v in headers if k.lower() == b"etag"), None)
+        key = (etag.decode("latin-1"), encoding, len(body)) if etag is not None else None
+        compressed = compressed_bodies.get(key) if key is not None else None
+        if compressed is None:
+            started = time.perf_counter()
+            if len(body) > THREADPOOL_BYTES:
+                compressed = await run_in_threadpool(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            compressed_bodies.record(encoding, len(body), len(compressed), time.perf_counter() - started)
+            if key is not None:
+                compressed_bodies.put(key, compressed)
+        else:
+            compressed_bodies.record(encoding, len(body), len(compressed))
+        vary_value = b", ".join(vary + [b"Accept-Encoding"])
+        start["headers"] = headers + [
+            (b"content-encoding", encoding.encode()),
+            (b"content-length", str(len(compressed)).encode()),
+            (b"vary", vary_value),
+        ]
+        return compressed
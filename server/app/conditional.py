@@ -0,0 +1,95 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import inspect
+
+
+def _as_utc(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # SQLite hands back naive timestamps written by CURRENT_TIMESTAMP (UTC)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _column_values(row) -> list:
+    """(column, value) pairs of an ORM object or a Row."""
+    mapping = getattr(row, "_mapping", None)
+    if mapping is not None:
+        return list(mapping.items())
+    return [(attr.key, getattr(row, attr.key)) for attr in inspect(row).mapper.column_attrs]
+
+
+class Validators:
+    """ETag / Last-Modified pair for a GET response."""
+
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @classmethod
+    def build(cls, namespace: str, *parts, last_modified=None) -> "Validators":
+        digest = hashlib.blake2b(
+            json.dumps([namespace, *parts], default=str).encode(), digest_size=12).hexdigest()
+        # Weak: the same data may be re-encoded differently (e.g. compressed)
+        return cls(f'W/"{digest}"', _as_utc(last_modified))
+
+    @classmethod
+    def for_listing(cls, namespace: str, fingerprint: dict, rows: list, *params) -> "Validators":
+        """
+        Validators for a page from the namespace fingerprint, the page's rows
+        (JSON-ready dicts, usually from the listing cache) and query params.
+        Everything hashed is derived from the data, so every instance gives
+        the same page the same ETag, and the rows catch two edits within one
+        second that the fingerprint's timestamps cannot tell apart.
+        """
+        return cls.build(namespace, fingerprint, rows, *params,
+                         last_modified=fingerprint.get("last_modified"))
+
+    @classmethod
+    def for_item(cls, namespace: str, obj, children=()) -> "Validators":
+        """
+        Validators for one row (plus embedded rows) from the column values
+        already loaded. Timestamps alone are not enough: SQLite stores them
+        to the second, so two edits within one second would share an ETag.
+        """
+        rows = [obj, *children]
+        stamps = [row.updated_at or row.created_at for row in rows]
+        return cls.build(namespace, [_column_values(row) for row in rows],
+                         last_modified=max((s for s in stamps if s is not None), default=None))
+
+    def matches(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison: W/"x" and "x" name the same representation
+            ours = self.etag.removeprefix("W/")
+            return "*" in candidates or any(tag.removeprefix("W/") == ours for tag in candidates)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = _as_utc(parsedate_to_datetime(if_modified_since))
+            except (TypeError, ValueError):
+                return False
+            return self.last_modified <= since
+        return False
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers())
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
@@ -13,6 +13,110 @@ class Settings(BaseSettings):
     HISTORY_DATABASE_URL: str = os.getenv(
         "HISTORY_DATABASE_URL", "sqlite:///./history.db"  # Provide a default value
     )
+    # Serve requests with AsyncSession (asyncpg / aiosqlite) instead of the
+    # blocking sessions run in the threadpool
+    ASYNC_DB: bool = os.getenv("ASYNC_DB", "False").lower() == "true"
+
+    # Connection pooling, applied to both the primary and history engines
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Seconds after which a pooled connection is replaced; keeps idle
+    # serverless instances from reusing connections the server already dropped
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 disables
+    # Use NullPool and let an external pooler (e.g. PgBouncer) manage connections
+    DB_EXTERNAL_POOLER: bool = os.getenv("DB_EXTERNAL_POOLER", "False").lower() == "true"
+
+    # Listing cache for /projects, /events and /products; a TTL of 0 disables it
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")  # memory | redis
+    CACHE_URL: str = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+    CACHE_TTL: float = float(os.getenv("CACHE_TTL", "300"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    # Maintain per-day/per-product order totals on every order write so
+    # /orders/stats can answer from the rollup table instead of orders_history
+    ORDER_ROLLUPS: bool = os.getenv("ORDER_ROLLUPS", "False").lower() == "true"
+    # How long POST /orders replays the response of an Idempotency-Key. With
+    # ORDER_WRITE_BEHIND keys never expire: each becomes the order's permanent
+    # reference, and reusing one always replays that order
+    IDEMPOTENCY_KEY_TTL: int = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+    # Write-behind order ingestion: POST /orders journals the order locally and
+    # answers 202 with a reference; a worker commits batches to orders_history.
+    # Needs a long-running process (not serverless) and a persistent disk
+    ORDER_WRITE_BEHIND: bool = os.getenv("ORDER_WRITE_BEHIND", "False").lower() == "true"
+    ORDER_QUEUE_PATH: str = os.getenv("ORDER_QUEUE_PATH", "./order_queue.db")
+    ORDER_QUEUE_BATCH_SIZE: int = int(os.getenv("ORDER_QUEUE_BATCH_SIZE", "200"))
+    ORDER_QUEUE_FLUSH_INTERVAL: float = float(os.getenv("ORDER_QUEUE_FLUSH_INTERVAL", "0.05"))
+    # Event dates and times are local to the campus; "upcoming" and "past" are decided here
+    EVENTS_TIMEZONE: str = os.getenv("EVENTS_TIMEZONE", "Asia/Kathmandu")
+
+    # bcrypt runs in a bounded worker pool; logins beyond workers + queue get a 503.
+    # Changing BCRYPT_ROUNDS rehashes each stored password on its next login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+
+    # Per-client token buckets for POST /users/login, /orders and /images, as
+    # "<requests>/<seconds>"; off (empty) by default. Clients are users with a
+    # known bearer token, else addresses. Behind a proxy every client has the
+    # proxy's address and would share one bucket: set RATE_LIMIT_CLIENT_HEADER
+    # to a header the proxy overwrites with the real one (index.py sets
+    # x-forwarded-for for Vercel). The memory backend counts per instance,
+    # redis shares buckets between instances
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+    RATE_LIMIT_URL: str = os.getenv("RATE_LIMIT_URL", os.getenv("CACHE_URL", "redis://localhost:6379/0"))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+    RATE_LIMIT_CLIENT_HEADER: str = os.getenv("RATE_LIMIT_CLIENT_HEADER", "")
+    RATE_LIMIT_LOGIN: str = os.getenv("RATE_LIMIT_LOGIN", "")  # e.g. "10/60"
+    RATE_LIMIT_ORDERS: str = os.getenv("RATE_LIMIT_ORDERS", "")  # e.g. "30/60"
+    RATE_LIMIT_IMAGES: str = os.getenv("RATE_LIMIT_IMAGES", "")  # e.g. "30/60"
+    # Load shedding for those endpoints: 503 with Retry-After when this many
+    # are running on the instance, the recent pool checkout wait exceeds
+    # ADMISSION_MAX_POOL_WAIT seconds or the order queue is this deep (0 disables each)
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+    ADMISSION_MAX_POOL_WAIT: float = float(os.getenv("ADMISSION_MAX_POOL_WAIT", "1.0"))
+    ADMISSION_MAX_ORDER_QUEUE: int = int(os.getenv("ADMISSION_MAX_ORDER_QUEUE", "10000"))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+    # JWTs are signed with SECRET_KEY; validated tokens are cached until they expire
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1024"))
+    # Fraction of successful token checks that are logged; failures are always logged
+    AUTH_LOG_SAMPLE_RATE: float = float(os.getenv("AUTH_LOG_SAMPLE_RATE", "0.01"))
+
+    # gzip/brotli for responses of at least COMPRESSION_MIN_SIZE bytes; compressed
+    # bodies of responses with an ETag are kept (up to COMPRESSION_CACHE_BYTES)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_CACHE_BYTES: int = int(os.getenv("COMPRESSION_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+    # Uploaded images are stored by content hash and served from /images with
+    # immutable cache headers; Pillow renders WebP variants of these widths in
+    # IMAGE_WORKERS threads. The local store needs a persistent disk (not
+    # serverless); IMAGE_PUBLIC_URL puts a CDN in front of /images
+    IMAGE_STORAGE: str = os.getenv("IMAGE_STORAGE", "local")
+    IMAGE_STORAGE_PATH: str = os.getenv("IMAGE_STORAGE_PATH", "./uploads")
+    IMAGE_PUBLIC_URL: str = os.getenv("IMAGE_PUBLIC_URL", "")
+    IMAGE_MAX_BYTES: int = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+    IMAGE_VARIANT_WIDTHS: str = os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280")
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+
+    # Per-route latency, SQL and response size metrics served at /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "True").lower() == "true"
+
+    # Apply pending schema migrations on startup (or first database use with
+    # LAZY_STARTUP); when off, the app refuses to run against an outdated
+    # schema and `python -m app.migrations upgrade` is needed
+    DB_MIGRATE_ON_STARTUP: bool = os.getenv("DB_MIGRATE_ON_STARTUP", "True").lower() == "true"
+    # Serverless mode: import each router on the first request under its prefix
+    # and move the schema check from startup to the first use of each database
+    LAZY_STARTUP: bool = os.getenv("LAZY_STARTUP", "False").lower() == "true"
 
     class Config:
         env_file = ".env"  # Make sure your .env file has HISTORY_DATABASE_URL
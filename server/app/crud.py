@@ -1,8 +1,91 @@
+from sqlalchemy import Date, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
-from typing import Optional, List  # Added Optional and List
-from app import models, schemas
-from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from datetime import datetime, time, timedelta
+from typing import Optional, List, Tuple  # Added Optional and List
+from app import models, schemas, search
+from app.cache import cached_fingerprint, cached_listing, invalidate
+from app.config import settings
+from app.event_dates import event_start
+from app.pagination import paginate
+from app.projection import Projection
+
+
+def _fingerprint(db: Session, *tables) -> dict:
+    """Row counts, highest ids and latest change time of the given models in one query."""
+    columns = []
+    for model in tables:
+        changed = func.coalesce(model.updated_at, model.created_at)
+        columns += [select(aggregate).scalar_subquery()
+                    for aggregate in (func.count(model.id), func.max(model.id), func.max(changed))]
+    row = db.execute(select(*columns)).one()
+    stamps = [value for value in row[2::3] if value is not None]
+    return {
+        "counts": list(row[0::3]),
+        "max_ids": list(row[1::3]),
+        "last_modified": max(stamps).isoformat() if stamps else None,
+    }
+
+
+# Bulk helpers: one statement per batch, rows come back as plain Row objects
+# so nothing is expired (and re-selected) by the commit that follows
+def _bulk_insert(db: Session, model, values: List[dict]):
+    if not values:
+        return []
+    table = model.__table__
+    statement = insert(table).returning(*table.c, sort_by_parameter_order=True)
+    return db.execute(statement, values).all()
+
+
+def _bulk_update(db: Session, model, values: List[dict]):
+    """Apply per-row partial updates by primary key; returns (updated rows, missing ids)."""
+    ids = [v["id"] for v in values]
+    existing = set(db.scalars(select(model.id).where(model.id.in_(ids))))
+    changes = [v for v in values if v["id"] in existing and len(v) > 1]
+    if changes:
+        db.execute(update(model), changes)
+    table = model.__table__
+    rows = db.execute(select(*table.c).where(model.id.in_(existing)).order_by(model.id)).all()
+    return rows, [i for i in ids if i not in existing]
+
+
+def _bulk_delete(db: Session, model, ids: List[int]):
+    if not ids:
+        return []
+    return list(db.scalars(delete(model.__table__).where(model.id.in_(ids)).returning(model.id)))
+
+
+# Single-row writes: one UPDATE/DELETE ... RETURNING instead of SELECT, write
+# and a refresh SELECT. Dialects without RETURNING (SQLite before 3.35) get
+# the write plus one SELECT. Rows come back as plain Row objects, like the
+# bulk helpers above
+def _update_returning(db: Session, model, row_id: int, values: dict):
+    """Apply `values` to one row by id and return it; None when it does not exist."""
+    table = model.__table__
+    where = table.c.id == row_id
+    values = {key: value for key, value in values.items() if key in table.c}
+    if not values:
+        return db.execute(select(*table.c).where(where)).first()
+    statement = update(table).where(where).values(**values)
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(*table.c)).first()
+    if db.execute(statement).rowcount == 0:
+        return None
+    return db.execute(select(*table.c).where(where)).first()
+
+
+def _delete_returning(db: Session, model, row_id: int):
+    """Delete one row by id and return it as it was; None when it does not exist."""
+    table = model.__table__
+    where = table.c.id == row_id
+    if db.get_bind().dialect.delete_returning:
+        return db.execute(delete(table).where(where).returning(*table.c)).first()
+    row = db.execute(select(*table.c).where(where)).first()
+    if row is not None:
+        db.execute(delete(table).where(where))
+    return row
+
 
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -12,33 +95,50 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
-
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+def get_users(db: Session, skip: int = 0, limit: int = 100, after: Optional[list] = None,
+              projection: Optional[Projection] = None):
+    query = db.query(models.User)
+    if projection is not None:
+        query = query.options(*projection.options(models.User))
+    return paginate(query, (models.User.id,), skip, limit, after).all()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    # Hash the password before storing
-    hashed_password = get_password_hash(user.password)
-    
+def create_user(db: Session, user: schemas.UserCreate, password_hash: str):
+    # The password is hashed by the caller, off the event loop
     db_user = models.User(
         email=user.email, 
         name=user.name,
-        password_hash=hashed_password  # Add the hashed password
+        password_hash=password_hash
     )
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+def update_user_password_hash(db: Session, user_id: int, password_hash: str):
+    db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(password_hash=password_hash)
+    )
+    db.commit()
+
 
 def get_product(db: Session, product_id: int):
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
 
-def get_products(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Product).offset(skip).limit(limit).all()
+@cached_listing("products", schemas.Product)
+def get_products(db: Session, skip: int = 0, limit: int = 100, after: Optional[list] = None,
+                 projection: Optional[Projection] = None):
+    query = db.query(models.Product)
+    if projection is not None:
+        query = query.options(*projection.options(models.Product))
+    return paginate(query, (models.Product.id,), skip, limit, after).all()
+
+
+@cached_fingerprint("products")
+def get_products_fingerprint(db: Session):
+    return _fingerprint(db, models.Product)
 
 
 def create_product(db: Session, product: schemas.ProductCreate):
@@ -50,39 +150,80 @@ def create_product(db: Session, product: schemas.ProductCreate):
         in_stock=product.in_stock
     )
     db.add(db_product)
+    db.flush()
+    search.index_rows(db, "product", [db_product])
     db.commit()
+    invalidate("products")
     db.refresh(db_product)
     return db_product
 
 
 def update_product(db: Session, product_id: int, product_update: schemas.ProductUpdate):
-    db_product = db.query(models.Product).filter(
-        models.Product.id == product_id).first()
+    db_product = _update_returning(db, models.Product, product_id, product_update.dict(exclude_unset=True))
     if db_product:
-        update_data = product_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_product, field, value)
+        search.index_rows(db, "product", [db_product])
         db.commit()
-        db.refresh(db_product)
+        invalidate("products")
     return db_product
 
 
 def delete_product(db: Session, product_id: int):
-    db_product = db.query(models.Product).filter(
-        models.Product.id == product_id).first()
+    db_product = _delete_returning(db, models.Product, product_id)
     if db_product:
-        db.delete(db_product)
+        search.remove_documents(db, "product", [db_product.id])
         db.commit()
+        invalidate("products")
     return db_product
 
 
+def bulk_create_products(db: Session, products: List[schemas.ProductCreate]):
+    rows = _bulk_insert(db, models.Product, [p.model_dump() for p in products])
+    search.index_rows(db, "product", rows)
+    db.commit()
+    invalidate("products")
+    return rows
+
+
+def bulk_update_products(db: Session, updates: List[schemas.ProductBulkUpdate]):
+    rows, missing = _bulk_update(db, models.Product, [u.model_dump(exclude_unset=True) for u in updates])
+    search.index_rows(db, "product", rows)
+    db.commit()
+    invalidate("products")
+    return rows, missing
+
+
+def bulk_delete_products(db: Session, product_ids: List[int]):
+    deleted = _bulk_delete(db, models.Product, product_ids)
+    search.remove_documents(db, "product", deleted)
+    db.commit()
+    invalidate("products")
+    return deleted
+
+
 # Project CRUD operations
+def project_exists(db: Session, project_id: int) -> bool:
+    return db.scalar(select(models.Project.id).where(models.Project.id == project_id)) is not None
+
+
 def get_project(db: Session, project_id: int):
     return db.query(models.Project).options(selectinload(models.Project.sections)).filter(models.Project.id == project_id).first()
 
 
-def get_projects(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Project).options(selectinload(models.Project.sections)).offset(skip).limit(limit).all()
+@cached_listing("projects", schemas.Project)
+def get_projects(db: Session, skip: int = 0, limit: int = 100, after: Optional[list] = None,
+                 projection: Optional[Projection] = None):
+    query = db.query(models.Project)
+    if projection is None:
+        query = query.options(selectinload(models.Project.sections))
+    else:
+        # e.g. the portfolio grid: a few columns and no sections at all
+        query = query.options(*projection.options(models.Project))
+    return paginate(query, (models.Project.id,), skip, limit, after).all()
+
+
+@cached_fingerprint("projects")
+def get_projects_fingerprint(db: Session):
+    return _fingerprint(db, models.Project, models.ProjectSection)
 
 
 def create_project(db: Session, project: schemas.ProjectCreate):
@@ -94,32 +235,97 @@ def create_project(db: Session, project: schemas.ProjectCreate):
         status=project.status
     )
     db.add(db_project)
+    db.flush()
+    search.index_rows(db, "project", [db_project])
     db.commit()
+    invalidate("projects")
     db.refresh(db_project)
     return db_project
 
 
 def update_project(db: Session, project_id: int, project_update: schemas.ProjectUpdate):
-    db_project = db.query(models.Project).filter(
-        models.Project.id == project_id).first()
-    if db_project:
-        update_data = project_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_project, field, value)
-        db.commit()
-        db.refresh(db_project)
-    return db_project
+    """Update a project; returns it with its sections, as the response embeds them."""
+    db_project = _update_returning(db, models.Project, project_id, project_update.dict(exclude_unset=True))
+    if db_project is None:
+        return None
+    search.index_rows(db, "project", [db_project])
+    sections = models.ProjectSection.__table__
+    section_rows = db.execute(
+        select(*sections.c).where(sections.c.project_id == project_id).order_by(sections.c.id)).all()
+    db.commit()
+    invalidate("projects")
+    return {**db_project._mapping, "sections": section_rows}
 
 
 def delete_project(db: Session, project_id: int):
-    db_project = db.query(models.Project).filter(
-        models.Project.id == project_id).first()
+    # projects_sections.project_id is ON DELETE CASCADE, so the database
+    # removes the sections in the same statement
+    db_project = _delete_returning(db, models.Project, project_id)
     if db_project:
-        db.delete(db_project)
+        search.remove_documents(db, "project", [db_project.id])
+        search.remove_children(db, "section", [db_project.id])
         db.commit()
+        invalidate("projects")
     return db_project
 
 
+def save_project_tree(db: Session, tree: schemas.ProjectTree, project_id: Optional[int] = None):
+    """
+    Create a project (no project_id) or replace one, together with its whole
+    section list, in one transaction.
+
+    Listed sections with an id are updated when they changed, ones without
+    are inserted, and stored sections left out are deleted. Returns
+    (project with sections, indexes of listed ids that are not sections of
+    this project or appear twice); nothing is written when there are any.
+    The project is None as well when project_id does not exist.
+    """
+    sections = models.ProjectSection.__table__
+    project_values = tree.model_dump(exclude={"sections"})
+    if project_id is None:
+        db_project = _bulk_insert(db, models.Project, [project_values])[0]
+        existing = {}
+    else:
+        db_project = _update_returning(db, models.Project, project_id, project_values)
+        if db_project is None:
+            return None, []
+        existing = {row.id: row for row in db.execute(
+            select(*sections.c).where(sections.c.project_id == project_id))}
+
+    seen = set()
+    rejected = []
+    for index, section in enumerate(tree.sections):
+        if section.id is None:
+            continue
+        if section.id not in existing or section.id in seen:
+            rejected.append(index)
+        seen.add(section.id)
+    if rejected:
+        db.rollback()
+        return None, rejected
+
+    fields = ("title", "description", "details", "main_image_url")
+    changes = [section.model_dump() for section in tree.sections if section.id is not None
+               and any(getattr(existing[section.id], f) != getattr(section, f) for f in fields)]
+    if changes:
+        db.execute(update(models.ProjectSection), changes)
+    removed = _bulk_delete(db, models.ProjectSection, [i for i in existing if i not in seen])
+    inserted = _bulk_insert(db, models.ProjectSection, [
+        {**section.model_dump(exclude={"id"}), "project_id": db_project.id}
+        for section in tree.sections if section.id is None])
+
+    section_rows = db.execute(
+        select(*sections.c).where(sections.c.project_id == db_project.id).order_by(sections.c.id)).all()
+    touched = {change["id"] for change in changes} | {row.id for row in inserted}
+    # Removals first: on SQLite new sections can reuse the ids just deleted
+    search.remove_documents(db, "section", removed)
+    search.index_rows(db, "project", [db_project])
+    search.index_rows(db, "section", [row for row in section_rows if row.id in touched])
+    db.commit()
+    invalidate("projects")
+    return {**db_project._mapping, "sections": section_rows}, []
+
+
 # ProjectSection CRUD operations
 def get_project_section(db: Session, section_id: int):
     return db.query(models.ProjectSection).filter(models.ProjectSection.id == section_id).first()
@@ -141,46 +347,102 @@ def create_project_section(db: Session, section: schemas.ProjectSectionCreate):
         main_image_url=section.main_image_url
     )
     db.add(db_section)
+    db.flush()
+    search.index_rows(db, "section", [db_section])
     db.commit()
+    invalidate("projects")
     db.refresh(db_section)
     return db_section
 
 
 def update_project_section(db: Session, section_id: int, section_update: schemas.ProjectSectionUpdate):
-    db_section = db.query(models.ProjectSection).filter(
-        models.ProjectSection.id == section_id).first()
+    # Fields that are not columns are ignored by _update_returning
+    db_section = _update_returning(
+        db, models.ProjectSection, section_id, section_update.dict(exclude_unset=True))
     if db_section:
-        update_data = section_update.dict(exclude_unset=True)
-        # Ensure main_image_url is correctly handled if present in update_data
-        if 'main_image_url' in update_data:
-            setattr(db_section, 'main_image_url',
-                    update_data['main_image_url'])
-
-        for field, value in update_data.items():
-            # Avoid trying to set main_image_url again if already handled or other fields
-            if hasattr(db_section, field):  # Check if attribute exists
-                setattr(db_section, field, value)
+        search.index_rows(db, "section", [db_section])
         db.commit()
-        db.refresh(db_section)
+        invalidate("projects")
     return db_section
 
 
 def delete_project_section(db: Session, section_id: int):
-    db_section = db.query(models.ProjectSection).filter(
-        models.ProjectSection.id == section_id).first()
+    db_section = _delete_returning(db, models.ProjectSection, section_id)
     if db_section:
-        db.delete(db_section)
+        search.remove_documents(db, "section", [db_section.id])
         db.commit()
+        invalidate("projects")
     return db_section
 
 
+def bulk_create_project_sections(db: Session, sections: List[schemas.ProjectSectionCreate]):
+    rows = _bulk_insert(db, models.ProjectSection, [s.model_dump() for s in sections])
+    search.index_rows(db, "section", rows)
+    db.commit()
+    invalidate("projects")
+    return rows
+
+
+def bulk_update_project_sections(db: Session, updates: List[schemas.ProjectSectionBulkUpdate]):
+    rows, missing = _bulk_update(
+        db, models.ProjectSection, [u.model_dump(exclude_unset=True) for u in updates])
+    search.index_rows(db, "section", rows)
+    db.commit()
+    invalidate("projects")
+    return rows, missing
+
+
+def bulk_delete_project_sections(db: Session, section_ids: List[int]):
+    deleted = _bulk_delete(db, models.ProjectSection, section_ids)
+    search.remove_documents(db, "section", deleted)
+    db.commit()
+    invalidate("projects")
+    return deleted
+
+
 # Event CRUD operations
 def get_event(db: Session, event_id: int):
     return db.query(models.Events).filter(models.Events.id == event_id).first()
 
 
-def get_events(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Events).offset(skip).limit(limit).all()
+# Listing orders of /events: sort key columns and whether they run descending
+EVENT_SORTS = {
+    "id": (("id",), False),
+    "date": (("starts_at", "id"), False),
+    "-date": (("starts_at", "id"), True),
+}
+
+
+@cached_listing("events", schemas.Event)
+def get_events(db: Session, skip: int = 0, limit: int = 100, after: Optional[list] = None,
+               projection: Optional[Projection] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, location: Optional[str] = None, sort: str = "id"):
+    """
+    Events starting in [start, end) whose location contains `location`, in
+    EVENT_SORTS order. Date filters and date sorting leave out events
+    without a parseable date.
+    """
+    event = models.Events
+    query = db.query(event)
+    if projection is not None:
+        query = query.options(*projection.options(event))
+    keys, descending = EVENT_SORTS[sort]
+    if start is not None or end is not None or "starts_at" in keys:
+        query = query.filter(event.starts_at.isnot(None))
+    if start is not None:
+        query = query.filter(event.starts_at >= start)
+    if end is not None:
+        query = query.filter(event.starts_at < end)
+    if location:
+        escaped = location.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(event.location.ilike(f"%{escaped}%", escape="\\"))
+    columns = tuple(getattr(event, key) for key in keys)
+    return paginate(query, columns, skip, limit, after, descending=descending).all()
+
+
+@cached_fingerprint("events")
+def get_events_fingerprint(db: Session):
+    return _fingerprint(db, models.Events)
 
 
 def create_event(db: Session, event: schemas.EventCreate):
@@ -189,39 +451,89 @@ def create_event(db: Session, event: schemas.EventCreate):
         description=event.description,
         date=event.date,
         time=event.time,
+        starts_at=event_start(event.date, event.time),
         location=event.location,
         url=event.url,
         imageUrl=event.imageUrl
     )
     db.add(db_event)
+    db.flush()
+    search.index_rows(db, "event", [db_event])
     db.commit()
+    invalidate("events")
     db.refresh(db_event)
     return db_event
 
 
 def update_event(db: Session, event_id: int, event_update: schemas.EventUpdate):
-    db_event = db.query(models.Events).filter(
-        models.Events.id == event_id).first()
+    update_data = event_update.dict(exclude_unset=True)
+    if "date" in update_data or "time" in update_data:
+        if "date" in update_data and "time" in update_data:
+            stored = update_data
+        else:
+            # Rescheduling by date or time alone needs the stored other half
+            stored = db.execute(
+                select(models.Events.date, models.Events.time).where(models.Events.id == event_id)).first()
+            if stored is None:
+                return None
+            stored = stored._asdict()
+        update_data["starts_at"] = event_start(
+            update_data.get("date", stored["date"]), update_data.get("time", stored["time"]))
+    db_event = _update_returning(db, models.Events, event_id, update_data)
     if db_event:
-        update_data = event_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_event, field, value)
+        search.index_rows(db, "event", [db_event])
         db.commit()
-        db.refresh(db_event)
+        invalidate("events")
     return db_event
 
 
 def delete_event(db: Session, event_id: int):
-    db_event = db.query(models.Events).filter(
-        models.Events.id == event_id).first()
+    db_event = _delete_returning(db, models.Events, event_id)
     if db_event:
-        db.delete(db_event)
+        search.remove_documents(db, "event", [db_event.id])
         db.commit()
+        invalidate("events")
     return db_event
 
 
+def bulk_create_events(db: Session, events: List[schemas.EventCreate]):
+    rows = _bulk_insert(db, models.Events, [
+        {**e.model_dump(), "starts_at": event_start(e.date, e.time)} for e in events])
+    search.index_rows(db, "event", rows)
+    db.commit()
+    invalidate("events")
+    return rows
+
+
+def bulk_update_events(db: Session, updates: List[schemas.EventBulkUpdate]):
+    values = [u.model_dump(exclude_unset=True) for u in updates]
+    # Recompute starts_at for rows whose date or time changes, using the
+    # stored value of whichever of the two is not part of the update
+    rescheduled = {v["id"]: v for v in values if "date" in v or "time" in v}
+    if rescheduled:
+        current = db.execute(
+            select(models.Events.id, models.Events.date, models.Events.time)
+            .where(models.Events.id.in_(rescheduled))).all()
+        for row in current:
+            change = rescheduled[row.id]
+            change["starts_at"] = event_start(change.get("date", row.date), change.get("time", row.time))
+    rows, missing = _bulk_update(db, models.Events, values)
+    search.index_rows(db, "event", rows)
+    db.commit()
+    invalidate("events")
+    return rows, missing
+
+
+def bulk_delete_events(db: Session, event_ids: List[int]):
+    deleted = _bulk_delete(db, models.Events, event_ids)
+    search.remove_documents(db, "event", deleted)
+    db.commit()
+    invalidate("events")
+    return deleted
+
+
 # OrderHistory CRUD operations (using the history database)
-def create_order_history(db: Session, order: schemas.OrderHistoryCreate) -> models.OrderHistory:
+def _add_order_history(db: Session, order: schemas.OrderHistoryCreate) -> models.OrderHistory:
     db_order = models.OrderHistory(
         full_name=order.full_name,
         email=order.email,
@@ -231,35 +543,262 @@ def create_order_history(db: Session, order: schemas.OrderHistoryCreate) -> mode
         total_amount=order.total_amount
     )
     db.add(db_order)
+    if settings.ORDER_ROLLUPS:
+        db.flush()
+        db.refresh(db_order)  # order_date comes from the database
+        _apply_order_rollup(db, db_order, 1)
+    return db_order
+
+
+def create_order_history(db: Session, order: schemas.OrderHistoryCreate) -> models.OrderHistory:
+    db_order = _add_order_history(db, order)
     db.commit()
     db.refresh(db_order)
     return db_order
 
 
+def create_orders_history_batch(db: Session, orders: List[Tuple[str, schemas.OrderHistoryCreate, datetime]]) -> int:
+    """
+    Insert (reference, order, accepted_at) tuples from the write-behind queue
+    in one transaction. References already in orders_history are skipped,
+    so replaying a batch is harmless; returns the number of rows inserted.
+    """
+    references = [reference for reference, _, _ in orders]
+    existing = set(db.scalars(
+        select(models.OrderHistory.reference).where(models.OrderHistory.reference.in_(references))))
+    values = []
+    for reference, order, accepted_at in orders:
+        if reference in existing:
+            continue
+        existing.add(reference)
+        values.append({**order.model_dump(), "reference": reference, "order_date": accepted_at})
+    rows = _bulk_insert(db, models.OrderHistory, values)
+    if settings.ORDER_ROLLUPS:
+        for row in rows:
+            _apply_order_rollup(db, row, 1)
+    db.commit()
+    return len(rows)
+
+
+def get_order_history_by_reference(db: Session, reference: str) -> Optional[models.OrderHistory]:
+    return db.query(models.OrderHistory).filter(models.OrderHistory.reference == reference).first()
+
+
+def _live_idempotency_key(db: Session, key: str) -> Optional[models.OrderIdempotencyKey]:
+    return db.query(models.OrderIdempotencyKey).filter(
+        models.OrderIdempotencyKey.key == key,
+        models.OrderIdempotencyKey.expires_at > datetime.utcnow()).first()
+
+
+def create_order_history_once(db: Session, order: schemas.OrderHistoryCreate, key: str,
+                              request_hash: str) -> Tuple[models.OrderIdempotencyKey, bool]:
+    """
+    Create an order at most once per Idempotency-Key.
+
+    Returns the key's record and whether it was an earlier request's. The
+    key and the order are committed together, so a concurrent request with
+    the same key fails on the primary key, rolls back and gets the winner's
+    record instead of a second order.
+    """
+    existing = _live_idempotency_key(db, key)
+    if existing is not None:
+        return existing, True
+    now = datetime.utcnow()
+    # Also clears an expired record of this key, which would block the insert
+    db.execute(delete(models.OrderIdempotencyKey).where(models.OrderIdempotencyKey.expires_at <= now))
+    db_order = _add_order_history(db, order)
+    db.flush()
+    db.refresh(db_order)
+    record = models.OrderIdempotencyKey(
+        key=key,
+        request_hash=request_hash,
+        order_id=db_order.id,
+        response=schemas.OrderHistory.model_validate(db_order).model_dump_json(),
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+    db.add(record)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = _live_idempotency_key(db, key)
+        if existing is None:
+            raise
+        return existing, True
+    return record, False
+
+
 def get_order_history(db: Session, order_id: int) -> Optional[models.OrderHistory]:
     return db.query(models.OrderHistory).filter(models.OrderHistory.id == order_id).first()
 
 
-def get_orders_history(db: Session, skip: int = 0, limit: int = 100) -> List[models.OrderHistory]:
-    return db.query(models.OrderHistory).order_by(models.OrderHistory.order_date.desc()).offset(skip).limit(limit).all()
+def get_orders_history(db: Session, skip: int = 0, limit: int = 100, after: Optional[list] = None,
+                       projection: Optional[Projection] = None) -> List[models.OrderHistory]:
+    # Newest first; id breaks ties between orders placed in the same second
+    columns = (models.OrderHistory.order_date, models.OrderHistory.id)
+    query = db.query(models.OrderHistory)
+    if projection is not None:
+        query = query.options(*projection.options(models.OrderHistory))
+    return paginate(query, columns, skip, limit, after, descending=True).all()
+
+
+def get_orders_history_export_query(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Plain column select of orders in [start, end), oldest first, for streaming exports."""
+    order = models.OrderHistory
+    query = select(order.id, order.order_date, order.full_name, order.email, order.contact,
+                   order.product_title, order.quantity, order.total_amount)
+    if start is not None:
+        query = query.where(order.order_date >= start)
+    if end is not None:
+        query = query.where(order.order_date < end)
+    return query.order_by(order.order_date, order.id)
 
 
 def update_order_history(db: Session, order_id: int, order_update: schemas.OrderHistoryUpdate) -> Optional[models.OrderHistory]:
+    if not settings.ORDER_ROLLUPS:
+        db_order = _update_returning(db, models.OrderHistory, order_id, order_update.dict(exclude_unset=True))
+        db.commit()
+        return db_order
+    # The rollup needs the order as it was before the update
     db_order = db.query(models.OrderHistory).filter(
         models.OrderHistory.id == order_id).first()
     if db_order:
+        _apply_order_rollup(db, db_order, -1)
         update_data = order_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_order, key, value)
+        _apply_order_rollup(db, db_order, 1)
         db.commit()
         db.refresh(db_order)
     return db_order
 
 
 def delete_order_history(db: Session, order_id: int) -> Optional[models.OrderHistory]:
+    if not settings.ORDER_ROLLUPS:
+        db_order = _delete_returning(db, models.OrderHistory, order_id)
+        db.commit()
+        return db_order
+    # The rollup needs the order as it was before the delete
     db_order = db.query(models.OrderHistory).filter(
         models.OrderHistory.id == order_id).first()
     if db_order:
+        _apply_order_rollup(db, db_order, -1)
         db.delete(db_order)
         db.commit()
     return db_order
+
+
+# Order analytics
+ORDER_STATS_GROUPS = ("product", "customer", "day", "week", "month")
+
+
+def _order_day(db: Session, column):
+    """Calendar day of a timestamp column, computed in SQL."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
+
+
+def _time_bucket(db: Session, column, unit: str):
+    """First day of the day/week (Monday)/month containing `column`, as YYYY-MM-DD text."""
+    if db.get_bind().dialect.name == "sqlite":
+        if unit == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        if unit == "month":
+            return func.strftime("%Y-%m-01", column)
+        return func.date(column)
+    return func.to_char(func.date_trunc(unit, column), "YYYY-MM-DD")
+
+
+def _apply_order_rollup(db: Session, order: models.OrderHistory, sign: int):
+    """Add (sign=1) or remove (sign=-1) one order from its day/product rollup row."""
+    rollup = models.OrderDailyRollup
+    values = {
+        "day": order.order_date.date(),
+        "product_title": order.product_title,
+        "order_count": sign,
+        "quantity": sign * order.quantity,
+        "total_amount": sign * order.total_amount,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(rollup).values(**values)
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=[rollup.day, rollup.product_title],
+            set_={column: getattr(rollup, column) + getattr(upsert.excluded, column)
+                  for column in ("order_count", "quantity", "total_amount")}))
+        return
+    row = db.get(rollup, (values["day"], values["product_title"]))
+    if row is None:
+        db.add(rollup(**values))
+    else:
+        for column in ("order_count", "quantity", "total_amount"):
+            setattr(row, column, getattr(row, column) + values[column])
+
+
+def rebuild_order_rollups(db: Session) -> int:
+    """Recompute the rollup table from orders_history; returns the number of rollup rows."""
+    order, rollup = models.OrderHistory, models.OrderDailyRollup
+    day = _order_day(db, order.order_date)
+    db.execute(delete(rollup))
+    db.execute(insert(rollup).from_select(
+        ["day", "product_title", "order_count", "quantity", "total_amount"],
+        select(day, order.product_title, func.count(order.id),
+               func.sum(order.quantity), func.sum(order.total_amount))
+        .group_by(day, order.product_title)))
+    db.commit()
+    return db.scalar(select(func.count()).select_from(rollup))
+
+
+def get_order_stats(db: Session, group_by: Optional[str] = None, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, limit: int = 100) -> dict:
+    """
+    Order count, quantity and revenue for [start, end), optionally grouped.
+
+    Grouped results carry the overall totals as window sums, so one query
+    returns both the groups and the summary. With ORDER_ROLLUPS the daily
+    rollup table is read instead whenever the range falls on day boundaries.
+    """
+    whole_days = all(bound is None or bound.time() == time.min for bound in (start, end))
+    use_rollup = settings.ORDER_ROLLUPS and group_by != "customer" and whole_days
+    if use_rollup:
+        source = models.OrderDailyRollup
+        when, product = source.day, source.product_title
+        start, end = (start.date() if start else None), (end.date() if end else None)
+        measures = [func.sum(source.order_count), func.sum(source.quantity), func.sum(source.total_amount)]
+    else:
+        source = models.OrderHistory
+        when, product = source.order_date, source.product_title
+        measures = [func.count(source.id), func.sum(source.quantity), func.sum(source.total_amount)]
+
+    filters = []
+    if start is not None:
+        filters.append(when >= start)
+    if end is not None:
+        filters.append(when < end)
+
+    result = {"group_by": group_by, "source": "rollup" if use_rollup else "orders", "groups": []}
+    if group_by is None:
+        row = db.execute(select(*measures).where(*filters)).one()
+        return {**result, **_order_totals(row)}
+
+    if group_by == "product":
+        key = product
+    elif group_by == "customer":
+        key = models.OrderHistory.email
+    else:
+        key = _time_bucket(db, when, group_by)
+    ordering = key.asc() if group_by in ("day", "week", "month") else measures[2].desc()
+    rows = db.execute(
+        select(key, *measures, *[func.sum(m).over() for m in measures])
+        .where(*filters).group_by(key).order_by(ordering).limit(limit)).all()
+
+    totals = _order_totals(rows[0][4:] if rows else (0, 0, 0))
+    groups = [{"key": str(row[0]), **_order_totals(row[1:4])} for row in rows]
+    return {**result, **totals, "groups": groups}
+
+
+def _order_totals(row) -> dict:
+    count, quantity, total = row
+    return {"order_count": int(count or 0), "quantity": int(quantity or 0),
+            "total_amount": float(total or 0)}
@@ -1,31 +1,245 @@
-from sqlalchemy import create_engine
+import functools
+import threading
+from typing import Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from app.config import settings
+from app.instrumentation import instrument_engine
+from app.pool import engine_options
+
+# Async drivers used when ASYNC_DB is enabled
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver of a database URL for its async counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' URLs")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+# Engines and session factories are built on first use rather than at
+# import, so a cold start that never touches a database does not pay for the
+# DBAPI import and pool setup. `database.engine` and friends still work as
+# module attributes through __getattr__ below.
+_built = {}
+_build_lock = threading.RLock()  # factories call each other
+
+
+def _once(factory):
+    """Call `factory` on first use only, also under concurrent first requests."""
+    @functools.wraps(factory)
+    def get():
+        if factory.__name__ not in _built:
+            with _build_lock:
+                if factory.__name__ not in _built:
+                    _built[factory.__name__] = factory()
+        return _built[factory.__name__]
+    return get
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def enforce_foreign_keys(engine):
+    """
+    SQLite ignores foreign keys unless asked per connection; the primary
+    database relies on ON DELETE CASCADE for project sections.
+    """
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _enable_foreign_keys)
+
+
+def _check_schema(name: str):
+    # Every session factory confirms its database is migrated before the
+    # first session, so a LAZY_STARTUP instance that skipped the startup
+    # check never queries an outdated schema: one version SELECT per process,
+    # paid by the first request that uses the database
+    from app import migrations
+
+    migrations.ensure_database(name)
+
 
 # Primary Database Setup
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@_once
+def get_engine():
+    engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+    enforce_foreign_keys(engine)
+    instrument_engine(engine)
+    return engine
+
+
+@_once
+def get_session_local():
+    _check_schema("primary")
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
 Base = declarative_base()
 
+
 # History Database Setup
-engine_history = create_engine(settings.HISTORY_DATABASE_URL)
-SessionLocalHistory = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine_history)
+@_once
+def get_engine_history():
+    engine = create_engine(settings.HISTORY_DATABASE_URL, **engine_options(settings.HISTORY_DATABASE_URL))
+    instrument_engine(engine)
+    return engine
+
+
+@_once
+def get_session_local_history():
+    _check_schema("history")
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine_history())
+
+
 BaseHistory = declarative_base()  # New Base for history models
 
 
-def get_db():
-    db = SessionLocal()
+# Async Database Setup (only used when ASYNC_DB is enabled)
+@_once
+def get_async_engine():
+    engine = create_async_engine(
+        to_async_url(settings.DATABASE_URL),
+        **engine_options(settings.DATABASE_URL, is_async=True))
+    # Async engines emit their events through the wrapped sync engine
+    enforce_foreign_keys(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+@_once
+def get_async_session_local():
+    _check_schema("primary")
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+@_once
+def get_async_engine_history():
+    engine = create_async_engine(
+        to_async_url(settings.HISTORY_DATABASE_URL),
+        **engine_options(settings.HISTORY_DATABASE_URL, is_async=True))
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+@_once
+def get_async_session_local_history():
+    _check_schema("history")
+    return async_sessionmaker(get_async_engine_history(), autoflush=False, expire_on_commit=False)
+
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "SessionLocal": get_session_local,
+    "engine_history": get_engine_history,
+    "SessionLocalHistory": get_session_local_history,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_session_local,
+    "async_engine_history": get_async_engine_history,
+    "AsyncSessionLocalHistory": get_async_session_local_history,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def built(factory):
+    """What a lazy factory (e.g. get_engine) has built, or None when it was never called."""
+    return _built.get(factory.__name__)
+
+
+def built_engines() -> list:
+    """Sync engines (async ones through their sync_engine) that were built so far."""
+    engines = [_built[name] for name in ("get_engine", "get_engine_history") if name in _built]
+    engines += [_built[name].sync_engine
+                for name in ("get_async_engine", "get_async_engine_history") if name in _built]
+    return engines
+
+
+async def dispose_async_engines():
+    """Close pooled async connections, for the engines that were ever built."""
+    for name in ("get_async_engine", "get_async_engine_history"):
+        if name in _built:
+            await _built[name].dispose()
+
+
+DbSession = Union[Session, AsyncSession]
+
+
+def get_sync_db():
+    db = get_session_local()()
     try:
         yield db
     finally:
         db.close()
 
 
-def get_product_db():  # New dependency for history DB
-    db = SessionLocalHistory()
+def get_sync_product_db():  # New dependency for history DB
+    db = get_session_local_history()()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with get_async_session_local()() as db:
+        yield db
+
+
+async def get_async_product_db():
+    async with get_async_session_local_history()() as db:
+        yield db
+
+
+# Routers depend on these; the session flavour follows settings.ASYNC_DB
+get_db = get_async_db if settings.ASYNC_DB else get_sync_db
+get_product_db = get_async_product_db if settings.ASYNC_DB else get_sync_product_db
+
+
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    """
+    Run a crud function against either session flavour.
+
+    Sync sessions are driven from the threadpool as before; async sessions
+    run the same function through AsyncSession.run_sync, so the database I/O
+    is awaited on the event loop instead of pinning a worker thread.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def stream_db(db: DbSession, statement, batch_size: int = 1000):
+    """
+    Yield the rows of `statement` in lists of up to `batch_size`.
+
+    Uses yield_per so drivers that support it keep a server-side cursor open
+    instead of buffering the whole result; sync sessions fetch each batch in
+    the threadpool.
+    """
+    statement = statement.execution_options(yield_per=batch_size)
+    if isinstance(db, AsyncSession):
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            yield partition
+    else:
+        result = await run_in_threadpool(db.execute, statement)
+        async for partition in iterate_in_threadpool(result.partitions()):
+            yield partition
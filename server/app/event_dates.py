@@ -0,0 +1,53 @@
+import re
+from datetime import date, datetime, time
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+
+# "10:00", "9:30:00", "09:00 AM", "2 pm": the free-form times events were entered with
+_TIME = re.compile(r"^\s*(\d{1,2})(?:[:.](\d{2}))?(?::(\d{2}))?\s*(?:([ap])\.?\s*m\.?)?\s*$", re.IGNORECASE)
+
+
+def _parse_time(value: Optional[str]) -> time:
+    match = _TIME.match(value or "")
+    if not match:
+        return time()
+    hour, minute, second = int(match.group(1)), int(match.group(2) or 0), int(match.group(3) or 0)
+    meridiem = (match.group(4) or "").lower()
+    # Existing rows contain values like "14:00 PM"; an hour past 12 is already 24-hour
+    if meridiem == "p" and hour < 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59 or second > 59:
+        return time()
+    return time(hour, minute, second)
+
+
+def event_start(date_value: Optional[str], time_value: Optional[str]) -> Optional[datetime]:
+    """
+    Local start of an event from its YYYY-MM-DD date and free-form time.
+
+    Unreadable times count as the start of the day; None when the date
+    itself does not parse.
+    """
+    try:
+        day = date.fromisoformat((date_value or "").strip())
+    except ValueError:
+        return None
+    return datetime.combine(day, _parse_time(time_value))
+
+
+def local_today() -> datetime:
+    """Midnight today in EVENTS_TIMEZONE, naive like the stored start times."""
+    now = datetime.now(ZoneInfo(settings.EVENTS_TIMEZONE))
+    return datetime.combine(now.date(), time())
+
+
+def to_local(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to naive EVENTS_TIMEZONE time; naive ones are taken as local already."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(ZoneInfo(settings.EVENTS_TIMEZONE)).replace(tzinfo=None)
+
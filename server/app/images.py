@@ -0,0 +1,295 @@
+import functools
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional
+
+from fastapi import Query
+
+from app.config import settings
+
+# Pillow is optional: without it originals are stored and served as uploaded.
+# It is imported on first use, keeping it out of listing cold starts
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+# Phone cameras often write MPO (a JPEG with extra frames appended); its
+# first frame is an ordinary JPEG that every browser shows
+PILLOW_FORMATS = {"JPEG": "jpg", "MPO": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+# Originals are "<digest>.<ext>", variants "<digest>-<width>.webp"
+NAME = re.compile(r"^(?P<digest>[0-9a-f]{32})(?:-(?P<width>\d+))?\.(?P<ext>jpg|png|gif|webp)$")
+# The last path segment of an uploaded original, wherever it is served from
+ORIGINAL_URL = re.compile(r"/images/(?P<digest>[0-9a-f]{32})\.(?:jpg|png|gif|webp)$")
+# Names depend on the bytes only, so a name never changes what it serves
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Fields of the listing schemas holding an image URL
+IMAGE_FIELDS = ("image", "main_image_url", "imageUrl")
+
+
+class InvalidImage(ValueError):
+    """Raised for uploads that are too large or not a JPEG, PNG, GIF or WebP image."""
+
+
+class ImageStorage:
+    """Where originals and variants are kept, by file name."""
+
+    def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def read(self, name: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def write(self, name: str, data: bytes):
+        raise NotImplementedError
+
+
+class LocalImageStorage(ImageStorage):
+    """
+    Files in one directory. Needs a persistent disk shared by all instances
+    (not serverless); other stores plug in through ImageStorage.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.root, name))
+
+    def read(self, name):
+        try:
+            with open(os.path.join(self.root, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name, data):
+        os.makedirs(self.root, exist_ok=True)
+        # Readers never see half a file: write aside, then rename into place
+        fd, temporary = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temporary, os.path.join(self.root, name))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+def build_storage() -> ImageStorage:
+    if settings.IMAGE_STORAGE == "local":
+        return LocalImageStorage(settings.IMAGE_STORAGE_PATH)
+    raise ValueError(f"Unknown IMAGE_STORAGE '{settings.IMAGE_STORAGE}'")
+
+
+@functools.lru_cache(maxsize=None)
+def pillow():
+    """PIL's Image and ImageOps modules."""
+    from PIL import Image, ImageOps
+
+    return Image, ImageOps
+
+
+def variant_widths() -> List[int]:
+    return sorted(int(width) for width in settings.IMAGE_VARIANT_WIDTHS.split(",") if width.strip())
+
+
+def variant_name(digest: str, width: int) -> str:
+    return f"{digest}-{width}.webp"
+
+
+def detect_format(data: bytes) -> str:
+    """File extension of an accepted image format, checking the whole image when Pillow is there."""
+    if HAS_PILLOW:
+        Image, _ = pillow()
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image_format = image.format
+                image.verify()
+        except Exception as e:  # Pillow raises a variety of errors for bad input
+            raise InvalidImage("Not a readable image") from e
+        if image_format not in PILLOW_FORMATS:
+            raise InvalidImage(f"Unsupported image format {image_format}")
+        return PILLOW_FORMATS[image_format]
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    raise InvalidImage("Unsupported image format")
+
+
+def render_variant(data: bytes, width: int) -> bytes:
+    """WebP of the image scaled down to `width` pixels wide; smaller images keep their size."""
+    Image, ImageOps = pillow()
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image.thumbnail((width, image.height * width // image.width + 1), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=settings.IMAGE_WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+class StoredImage(NamedTuple):
+    digest: str
+    name: str  # of the original
+    created: bool  # False when the same bytes were uploaded before
+
+
+class ImageService:
+    """
+    Content-addressed image store.
+
+    An upload is stored under a hash of its bytes and answered right away;
+    its WebP variants (IMAGE_VARIANT_WIDTHS) are rendered by a small worker
+    pool. A variant requested before its worker got to it is rendered on
+    the spot, so URLs handed out never 404.
+    """
+
+    def __init__(self, storage: ImageStorage, workers: int):
+        self.storage = storage
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.duplicates = 0
+        self.variants = 0
+        self.variants_on_demand = 0
+        self.failures = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created on the first upload so read-only instances start no threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+            return self._executor
+
+    def save(self, data: bytes) -> StoredImage:
+        if len(data) > settings.IMAGE_MAX_BYTES:
+            raise InvalidImage(f"Images are limited to {settings.IMAGE_MAX_BYTES} bytes")
+        ext = detect_format(data)
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        name = f"{digest}.{ext}"
+        created = not self.storage.exists(name)
+        if created:
+            self.storage.write(name, data)
+            if HAS_PILLOW:
+                self._pool().submit(self._render_all, digest, data)
+        with self._lock:
+            self.uploads += 1
+            self.duplicates += not created
+        return StoredImage(digest, name, created)
+
+    def _render(self, digest: str, data: bytes, width: int) -> bytes:
+        variant = render_variant(data, width)
+        self.storage.write(variant_name(digest, width), variant)
+        with self._lock:
+            self.variants += 1
+        return variant
+
+    def _render_all(self, digest: str, data: bytes):
+        for width in variant_widths():
+            if self.storage.exists(variant_name(digest, width)):
+                continue
+            try:
+                self._render(digest, data, width)
+            except Exception:
+                logger.exception("Rendering the %spx variant of %s failed", width, digest)
+                with self._lock:
+                    self.failures += 1
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Bytes of an original or variant by file name; None when there is no such image."""
+        match = NAME.match(name)
+        if match is None:
+            return None
+        data = self.storage.read(name)
+        if data is not None or match["width"] is None:
+            return data
+        width = int(match["width"])
+        if not HAS_PILLOW or match["ext"] != "webp" or width not in variant_widths():
+            return None
+        original = self.original(match["digest"])
+        if original is None:
+            return None
+        with self._lock:
+            self.variants_on_demand += 1
+        return self._render(match["digest"], original, width)
+
+    def original(self, digest: str) -> Optional[bytes]:
+        for ext in CONTENT_TYPES:
+            data = self.storage.read(f"{digest}.{ext}")
+            if data is not None:
+                return data
+        return None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "storage": type(self.storage).__name__,
+                "variants_enabled": HAS_PILLOW,
+                "widths": variant_widths(),
+                "uploads": self.uploads,
+                "duplicates": self.duplicates,
+                "variants_rendered": self.variants,
+                "variants_on_demand": self.variants_on_demand,
+                "failures": self.failures,
+            }
+
+
+images = ImageService(build_storage(), settings.IMAGE_WORKERS)
+
+
+def variant_url(url: Optional[str], width: int) -> Optional[str]:
+    """
+    URL of the variant of an uploaded image closest to `width` (the smallest
+    at least as wide, else the widest). Other URLs are returned unchanged.
+    """
+    if not url or not HAS_PILLOW:
+        return url
+    match = ORIGINAL_URL.search(url)
+    widths = variant_widths()
+    if match is None or not widths:
+        return url
+    chosen = next((w for w in widths if w >= width), widths[-1])
+    return url[:match.start()] + f"/images/{variant_name(match['digest'], chosen)}"
+
+
+def image_width_param(
+    image_width: Optional[int] = Query(
+        None, ge=1, le=4096,
+        description="Point uploaded images at their WebP variant for this display width"),
+) -> Optional[int]:
+    return image_width
+
+
+def with_variants(rows: list, width: Optional[int]) -> list:
+    """Listing rows (JSON-ready dicts) with image URLs, nested sections included, pointing at variants."""
+    if width is None or not HAS_PILLOW:
+        return rows
+
+    def rewrite(row: dict) -> dict:
+        changed = {field: variant_url(row[field], width) for field in IMAGE_FIELDS if row.get(field)}
+        if isinstance(row.get("sections"), list):
+            changed["sections"] = [rewrite(section) for section in row["sections"]]
+        # Copies: the rows may be shared with the listing cache
+        return {**row, **changed} if changed else row
+
+    return [rewrite(row) for row in rows]
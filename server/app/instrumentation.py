@@ -0,0 +1,178 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from app.config import settings
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """SQL work done while serving one request."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set per request by the middleware. The sync sessions run in the threadpool
+# and the async ones inside run_sync, both of which see a copy of this context,
+# so the engine listeners below update the same RequestStats object
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """Count statements and time spent in the database for the request being served."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "latency_sum", "count", "statuses", "queries", "db_seconds", "response_bytes")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+
+
+class Registry:
+    """Per-route request metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float,
+               stats: RequestStats, response_bytes: int):
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[i] += 1
+            metrics.latency_sum += seconds
+            metrics.count += 1
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.queries += stats.queries
+            metrics.db_seconds += stats.db_seconds
+            metrics.response_bytes += response_bytes
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            routes = sorted(self._routes.items())
+            for (method, route), m in routes:
+                labels = f'method="{method}",route="{route}"'
+                for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+
+            lines += ["# HELP http_requests_total Requests by route and status code.",
+                      "# TYPE http_requests_total counter"]
+            for (method, route), m in routes:
+                for status, count in sorted(m.statuses.items()):
+                    lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            for name, help_text, attr, fmt in (
+                ("http_response_size_bytes_total", "Response body bytes sent by route.", "response_bytes", "d"),
+                ("db_queries_total", "SQL statements executed by route.", "queries", "d"),
+                ("db_query_duration_seconds_total", "Time spent executing SQL by route.", "db_seconds", ".6f"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), m in routes:
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {getattr(m, attr):{fmt}}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class InstrumentationMiddleware:
+    """
+    Times every HTTP request, counts the SQL it ran and the bytes it sent,
+    and reports the timings in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route_path(self, scope) -> str:
+        # Label by route template (/projects/{project_id}) rather than raw
+        # path so the number of series stays bounded
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        # Rebuilt on a miss, as routers may be registered after the first request
+        if self._route_paths is None or endpoint not in self._route_paths:
+            self._route_paths = {
+                getattr(route, "endpoint", None): route.path
+                for route in scope["app"].routes if hasattr(route, "path")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.SERVER_TIMING:
+                    elapsed = (time.perf_counter() - started) * 1000
+                    timing = (f'app;dur={elapsed:.1f}, '
+                              f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"')
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            registry.record(scope["method"], self._route_path(scope), status,
+                            time.perf_counter() - started, stats, sent)
@@ -0,0 +1,39 @@
+import importlib
+import threading
+from typing import Dict
+
+# Paths that describe every route, so they need all routers registered
+DOCS_PATHS = ("/openapi.json", "/docs", "/redoc")
+
+
+class LazyRouterMiddleware:
+    """
+    Registers routers on the first request under their prefix.
+
+    `routers` maps a URL prefix to the module defining its `router`. Until a
+    request arrives for a prefix, neither the router nor what it imports
+    (crud, models, schemas) is loaded.
+    """
+
+    def __init__(self, app, target, routers: Dict[str, str]):
+        self.app = app
+        self.target = target  # the FastAPI app routes are added to
+        self.pending = dict(routers)
+        self._lock = threading.Lock()
+
+    def _load(self, prefixes):
+        with self._lock:
+            for prefix in prefixes:
+                module = self.pending.pop(prefix, None)
+                if module is not None:
+                    self.target.include_router(importlib.import_module(module).router)
+
+    async def __call__(self, scope, receive, send):
+        if self.pending and scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if path in DOCS_PATHS:
+                self._load(list(self.pending))
+            else:
+                self._load([prefix for prefix in self.pending
+                            if path == prefix or path.startswith(prefix + "/")])
+        await self.app(scope, receive, send)
@@ -1,18 +1,59 @@
+import importlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, engine_history
-from app import models
-from app.routers import users, products, projects, events, orders
+from starlette.concurrency import run_in_threadpool
+from app import database
+from app.config import settings
+from app.compression import CompressionMiddleware
+from app.instrumentation import InstrumentationMiddleware
+from app.lazy import LazyRouterMiddleware
+from app.responses import FastJSONResponse
+from app import images, migrations, order_queue, passwords
+
+app = FastAPI(title="IIEC API", version="1.0.0", default_response_class=FastJSONResponse)
 
-app = FastAPI(title="IIEC API", version="1.0.0")
+# Router modules by URL prefix
+ROUTERS = {
+    "/users": "app.routers.users",
+    "/products": "app.routers.products",
+    "/projects": "app.routers.projects",
+    "/events": "app.routers.events",
+    "/orders": "app.routers.orders",
+    "/search": "app.routers.search",
+    "/images": "app.routers.images",
+    "/metrics": "app.routers.metrics",
+}
 
 @app.on_event("startup")
 def on_startup():
-    # models.Base.metadata.drop_all(bind=engine) # For primary DB
-    models.Base.metadata.create_all(bind=engine)  # For primary DB
-    # models.BaseHistory.metadata.drop_all(bind = engine_history)
-    models.BaseHistory.metadata.create_all(
-        bind=engine_history)  # For history DB
+    # Pending migrations are applied to both databases, or with
+    # DB_MIGRATE_ON_STARTUP off refused (see app/migrations); once current,
+    # this is a single version lookup each. With LAZY_STARTUP the same check
+    # runs when the first session of each database is made (app/database.py),
+    # so cold starts that never touch a database skip it
+    if not settings.LAZY_STARTUP:
+        migrations.ensure_all()
+    if settings.ORDER_WRITE_BEHIND:
+        # Also flushes orders journaled before a crash or restart
+        order_queue.queue.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Pooled async connections (aiosqlite runs one thread each) must be closed
+    if settings.ORDER_WRITE_BEHIND:
+        await run_in_threadpool(order_queue.queue.stop)
+    await database.dispose_async_engines()
+    passwords.shutdown()
+    images.images.shutdown()
+
+if settings.LAZY_STARTUP:
+    # Innermost, so routers are registered before routing sees the request
+    app.add_middleware(LazyRouterMiddleware, target=app, routers=ROUTERS)
+else:
+    for module in ROUTERS.values():
+        app.include_router(importlib.import_module(module).router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,13 +66,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed", "Retry-After"],
 )
-
-app.include_router(users.router)
-app.include_router(products.router)
-app.include_router(projects.router)
-app.include_router(events.router)
-app.include_router(orders.router)  # Include the new orders router
+app.add_middleware(CompressionMiddleware)
+# Added last so it wraps CORS and times the whole request, and counts the
+# bytes actually sent after compression
+app.add_middleware(InstrumentationMiddleware)
 
 # Add a root endpoint for testing
 @app.get("/")
@@ -0,0 +1,161 @@
+"""
+Versioned schema migrations for the primary and history databases.
+
+Each database has an ordered list of migrations (primary.py, history.py)
+and a schema_migrations table recording the ones applied. Startup reads
+that table once per process instead of reflecting every model, and only
+runs DDL when the code expects a newer version:
+
+    python -m app.migrations status
+    python -m app.migrations upgrade
+
+Never edit a migration that has shipped; add a new one with the next
+version number instead. Models describe the latest schema, migrations
+describe how to get there.
+"""
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_xact_lock, so concurrent cold starts do not
+# apply the same migration twice
+ADVISORY_LOCK_KEY = 7315001
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def migration(registry: List[Migration], version: int, name: str):
+    """Register an upgrade function under the next version of `registry`."""
+    def decorator(fn):
+        if registry and version != registry[-1].version + 1:
+            raise ValueError(f"Migration {version} ({name}) does not follow {registry[-1].version}")
+        registry.append(Migration(version, name, fn))
+        return fn
+    return decorator
+
+
+def replace_search_documents(conn: Connection, kind: str, code: int, rows: List[tuple]):
+    """
+    Replace every search document of `kind` with `rows` of (id, parent_id,
+    title, *body parts), written as search_documents stood at its creation:
+    FTS5 rowid id * 8 + `code` on SQLite, a weighted tsvector on Postgres.
+    """
+    conn.execute(text("DELETE FROM search_documents WHERE kind = :kind"), {"kind": kind})
+    documents = [
+        {"rowid": row[0] * 8 + code, "kind": kind, "ref_id": row[0], "parent_id": row[1],
+         "title": row[2] or "", "body": "\n".join(filter(None, row[3:]))}
+        for row in rows
+    ]
+    if not documents:
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            """INSERT INTO search_documents (kind, ref_id, parent_id, title, body, document)
+            VALUES (:kind, :ref_id, :parent_id, :title, :body,
+                    setweight(to_tsvector('english', :title), 'A') ||
+                    setweight(to_tsvector('english', :body), 'B'))"""), documents)
+    else:
+        conn.execute(text(
+            """INSERT INTO search_documents (rowid, kind, ref_id, parent_id, title, body)
+            VALUES (:rowid, :kind, :ref_id, :parent_id, :title, :body)"""), documents)
+
+
+class SchemaOutdated(RuntimeError):
+    """Raised at startup when migrations are pending and DB_MIGRATE_ON_STARTUP is off."""
+
+
+# Versions confirmed current in this process, by database name
+_checked: Dict[str, int] = {}
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version; 0 for databases that predate schema_migrations."""
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(select(func.max(schema_migrations.c.version))) or 0
+    except DBAPIError:
+        return 0
+
+
+def upgrade(engine: Engine, migrations: List[Migration]) -> List[Migration]:
+    """Apply pending migrations in one transaction; returns the ones applied."""
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        schema_migrations.create(conn, checkfirst=True)
+        # Re-read under the lock; another instance may have just finished
+        version = conn.scalar(select(func.max(schema_migrations.c.version))) or 0
+        pending = [m for m in migrations if m.version > version]
+        for m in pending:
+            logger.info("Applying migration %s %s", m.version, m.name)
+            m.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=m.version, name=m.name, applied_at=datetime.utcnow()))
+    return pending
+
+
+def ensure_current(name: str, engine: Engine, migrations: List[Migration]):
+    """
+    Bring a database up to the latest migration, or check that it is.
+
+    One SELECT on the first call per process; later calls return at once.
+    """
+    latest = migrations[-1].version
+    if _checked.get(name) == latest:
+        return
+    version = current_version(engine)
+    if version < latest:
+        if not settings.DB_MIGRATE_ON_STARTUP:
+            raise SchemaOutdated(
+                f"The {name} database is at schema version {version}, this code needs {latest}; "
+                "run `python -m app.migrations upgrade`")
+        upgrade(engine, migrations)
+    elif version > latest:
+        logger.warning("The %s database is at schema version %s, newer than this code (%s)",
+                       name, version, latest)
+    _checked[name] = latest
+
+
+def _registry() -> Dict[str, tuple]:
+    from app.database import get_engine, get_engine_history
+    from app.migrations import history, primary
+
+    return {
+        "primary": (get_engine, primary.MIGRATIONS),
+        "history": (get_engine_history, history.MIGRATIONS),
+    }
+
+
+def databases() -> Dict[str, tuple]:
+    """(engine, migrations) of every database, by name."""
+    return {name: (get_engine(), migrations) for name, (get_engine, migrations) in _registry().items()}
+
+
+def ensure_database(name: str):
+    """ensure_current for one database, building only that database's engine."""
+    get_engine, migrations = _registry()[name]
+    ensure_current(name, get_engine(), migrations)
+
+
+def ensure_all():
+    for name in _registry():
+        ensure_database(name)
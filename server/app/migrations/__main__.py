@@ -0,0 +1,31 @@
+"""
+    python -m app.migrations status
+    python -m app.migrations upgrade
+"""
+import argparse
+import logging
+
+from app.migrations import current_version, databases, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Manage the database schemas.")
+    parser.add_argument("command", choices=("status", "upgrade"))
+    parser.add_argument("--database", choices=("primary", "history"), help="only this database")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    for name, (engine, migrations) in databases().items():
+        if args.database and name != args.database:
+            continue
+        if args.command == "upgrade":
+            applied = upgrade(engine, migrations)
+            print(f"{name}: applied {len(applied)} migration(s)")
+        version = current_version(engine)
+        pending = [m for m in migrations if m.version > version]
+        print(f"{name}: version {version} of {migrations[-1].version}"
+              + "".join(f"\n  pending {m.version} {m.name}" for m in pending))
+
+
+if __name__ == "__main__":
+    main()
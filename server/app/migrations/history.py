@@ -0,0 +1,96 @@
+"""
+Migrations of the history database (products, orders, order rollups).
+
+Tables are spelled out as they were at each version, as in primary.py.
+"""
+from typing import List
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, Index, Integer, MetaData, String, Table, Text, null, select, text
+from sqlalchemy.sql import func
+
+from app import search
+from app.migrations import Migration, migration, replace_search_documents
+
+MIGRATIONS: List[Migration] = []
+
+
+@migration(MIGRATIONS, 1, "initial tables")
+def initial_tables(conn):
+    metadata = MetaData()
+    Table(
+        "products", metadata,
+        Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+        Column("name", String, nullable=False),
+        Column("description", Text),
+        Column("price", Float, nullable=False),
+        Column("image", String),
+        Column("in_stock", Boolean),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    Table(
+        "orders_history", metadata,
+        Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+        Column("full_name", String, nullable=False),
+        Column("email", String, nullable=False, index=True),
+        Column("contact", String, nullable=False),
+        Column("product_title", String, nullable=False),
+        Column("quantity", Integer, nullable=False),
+        Column("total_amount", Float, nullable=False),
+        Column("order_date", DateTime(timezone=True), server_default=func.now()),
+    )
+    metadata.create_all(conn, checkfirst=True)
+
+
+@migration(MIGRATIONS, 2, "orders keyset index and daily rollup")
+def orders_rollup(conn):
+    metadata = MetaData()
+    orders = Table(
+        "orders_history", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("order_date", DateTime(timezone=True)),
+    )
+    Index("ix_orders_history_order_date_id", orders.c.order_date, orders.c.id).create(conn, checkfirst=True)
+    Table(
+        "orders_daily_rollup", metadata,
+        Column("day", Date, primary_key=True),
+        Column("product_title", String, primary_key=True),
+        Column("order_count", Integer, nullable=False),
+        Column("quantity", Integer, nullable=False),
+        Column("total_amount", Float, nullable=False),
+    ).create(conn, checkfirst=True)
+
+
+@migration(MIGRATIONS, 3, "search documents")
+def search_documents(conn):
+    search.create_search_schema(conn)
+
+
+@migration(MIGRATIONS, 4, "order idempotency keys")
+def order_idempotency_keys(conn):
+    metadata = MetaData()
+    Table(
+        "order_idempotency_keys", metadata,
+        Column("key", String, primary_key=True),
+        Column("request_hash", String, nullable=False),
+        Column("order_id", Integer, nullable=False),
+        Column("response", Text, nullable=False),
+        Column("expires_at", DateTime, nullable=False, index=True),
+    ).create(conn, checkfirst=True)
+
+
+@migration(MIGRATIONS, 5, "orders_history.reference")
+def orders_reference(conn):
+    conn.execute(text("ALTER TABLE orders_history ADD COLUMN reference VARCHAR"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_orders_history_reference ON orders_history (reference)"))
+
+
+@migration(MIGRATIONS, 6, "search documents backfill")
+def search_documents_backfill(conn):
+    # Migration 3 created the index empty; rows written before it were only
+    # found after a manual POST /search/rebuild
+    products = Table(
+        "products", MetaData(),
+        Column("id", Integer), Column("name", String), Column("description", Text))
+    replace_search_documents(conn, "product", 4, conn.execute(select(
+        products.c.id, null(), products.c.name, products.c.description)).all())
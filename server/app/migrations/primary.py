@@ -0,0 +1,158 @@
+"""
+Migrations of the primary database (users, projects, sections, events).
+
+Tables are spelled out as they were at each version rather than imported
+from app.models, so replaying old migrations keeps producing the same schema
+after the models move on.
+"""
+from typing import List
+
+from sqlalchemy import (Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+                        bindparam, inspect, null, select, text)
+from sqlalchemy.sql import func
+
+from app import search
+from app.event_dates import event_start
+from app.migrations import Migration, migration, replace_search_documents
+
+MIGRATIONS: List[Migration] = []
+
+
+@migration(MIGRATIONS, 1, "initial tables")
+def initial_tables(conn):
+    # Databases built by create_all before migrations existed already have
+    # these tables; checkfirst adopts them as they are
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String, unique=True, index=True),
+        Column("name", String),
+        Column("password_hash", String),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    Table(
+        "projects", metadata,
+        Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+        Column("name", String, nullable=False),
+        Column("description", Text),
+        Column("overview", Text),
+        Column("main_image_url", String),
+        Column("status", String),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    Table(
+        "projects_sections", metadata,
+        Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+        Column("project_id", Integer, ForeignKey("projects.id"), nullable=False),
+        Column("title", String, nullable=False),
+        Column("description", Text),
+        Column("details", Text),
+        Column("main_image_url", String),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    Table(
+        "events", metadata,
+        Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+        Column("title", String, nullable=False),
+        Column("description", Text),
+        Column("date", String, nullable=False),
+        Column("time", String, nullable=False),
+        Column("location", String, nullable=False),
+        Column("url", String),
+        Column("imageUrl", String),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    metadata.create_all(conn, checkfirst=True)
+
+
+@migration(MIGRATIONS, 2, "events.starts_at")
+def events_starts_at(conn):
+    events = Table(
+        "events", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("date", String),
+        Column("time", String),
+        Column("starts_at", DateTime),
+    )
+    # Startup used to add the column itself, so it may exist already
+    if "starts_at" not in {c["name"] for c in inspect(conn).get_columns("events")}:
+        column_type = "TIMESTAMP" if conn.dialect.name == "postgresql" else "DATETIME"
+        conn.execute(text(f"ALTER TABLE events ADD COLUMN starts_at {column_type}"))
+    rows = conn.execute(
+        select(events.c.id, events.c.date, events.c.time).where(events.c.starts_at.is_(None))).all()
+    values = [{"event_id": row.id, "starts_at": event_start(row.date, row.time)} for row in rows]
+    if values:
+        conn.execute(
+            events.update().where(events.c.id == bindparam("event_id")).values(starts_at=bindparam("starts_at")),
+            values)
+    Index("ix_events_starts_at_id", events.c.starts_at, events.c.id).create(conn, checkfirst=True)
+
+
+@migration(MIGRATIONS, 3, "search documents")
+def search_documents(conn):
+    search.create_search_schema(conn)
+
+
+@migration(MIGRATIONS, 4, "projects_sections cascade")
+def projects_sections_cascade(conn):
+    # Sections of projects deleted before the cascade existed would block
+    # the new constraint
+    conn.execute(text(
+        "DELETE FROM projects_sections WHERE project_id NOT IN (SELECT id FROM projects)"))
+    if conn.dialect.name == "postgresql":
+        for foreign_key in inspect(conn).get_foreign_keys("projects_sections"):
+            if foreign_key["referred_table"] == "projects" and foreign_key["name"]:
+                conn.execute(text(f'ALTER TABLE projects_sections DROP CONSTRAINT "{foreign_key["name"]}"'))
+        conn.execute(text(
+            "ALTER TABLE projects_sections ADD CONSTRAINT projects_sections_project_id_fkey "
+            "FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE"))
+        return
+    # SQLite cannot alter a constraint; rebuild the table with it
+    metadata = MetaData()
+    rebuilt = Table(
+        "projects_sections_new", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("project_id", Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
+        Column("title", String, nullable=False),
+        Column("description", Text),
+        Column("details", Text),
+        Column("main_image_url", String),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    Table("projects", metadata, Column("id", Integer, primary_key=True))
+    rebuilt.create(conn)
+    columns = ", ".join(column.name for column in rebuilt.c)
+    conn.execute(text(f"INSERT INTO projects_sections_new ({columns}) SELECT {columns} FROM projects_sections"))
+    conn.execute(text("DROP TABLE projects_sections"))
+    conn.execute(text("ALTER TABLE projects_sections_new RENAME TO projects_sections"))
+    conn.execute(text("CREATE INDEX ix_projects_sections_id ON projects_sections (id)"))
+
+
+@migration(MIGRATIONS, 5, "search documents backfill")
+def search_documents_backfill(conn):
+    # Migration 3 created the index empty; rows written before it were only
+    # found after a manual POST /search/rebuild
+    metadata = MetaData()
+    projects = Table(
+        "projects", metadata,
+        Column("id", Integer), Column("name", String), Column("description", Text), Column("overview", Text))
+    sections = Table(
+        "projects_sections", metadata,
+        Column("id", Integer), Column("project_id", Integer), Column("title", String),
+        Column("description", Text), Column("details", Text))
+    events = Table(
+        "events", metadata,
+        Column("id", Integer), Column("title", String), Column("description", Text), Column("location", String))
+    replace_search_documents(conn, "project", 1, conn.execute(select(
+        projects.c.id, null(), projects.c.name, projects.c.description, projects.c.overview)).all())
+    replace_search_documents(conn, "section", 2, conn.execute(select(
+        sections.c.id, sections.c.project_id, sections.c.title,
+        sections.c.description, sections.c.details)).all())
+    replace_search_documents(conn, "event", 3, conn.execute(select(
+        events.c.id, null(), events.c.title, events.c.description, events.c.location)).all())
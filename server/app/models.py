@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Float, Boolean, ForeignKey, JSON, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base, BaseHistory  # Import BaseHistory
-from passlib.context import CryptContext
-import bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Tables are created and altered by app/migrations, not from these models:
+# a schema change here needs a new migration there as well.
+
+# SQLite stores server_default=func.now() as "YYYY-MM-DD HH:MM:SS" text. Bind
+# datetimes in the same shape so range and cursor comparisons line up with it.
+SQLITE_TIMESTAMP = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d")
 
 class User(Base):
     __tablename__ = "users"
@@ -44,14 +50,19 @@ class Project(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    sections = relationship("ProjectSection", back_populates="project")
+    # Eager by default so sections are loaded before an AsyncSession hands
+    # the project back for serialization. Deleting a project leaves its
+    # sections to the database's ON DELETE CASCADE
+    sections = relationship(
+        "ProjectSection", back_populates="project", lazy="selectin",
+        cascade="all, delete-orphan", passive_deletes=True)
 
 
 class ProjectSection(Base):
     __tablename__ = "projects_sections"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     description = Column(Text)
     details = Column(Text)
@@ -70,12 +81,20 @@ class Events(Base):
     description = Column(Text)
     date = Column(String, nullable=False)  # Stores date as YYYY-MM-DD
     time = Column(String, nullable=False)
+    # Local start parsed from date and time, kept in sync by the event crud
+    # functions so date filters and sorting run in SQL
+    starts_at = Column(DateTime)
     location = Column(String, nullable=False)
     url = Column(String)
     imageUrl = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Serves the date range filters and the date-sorted keyset pagination
+        Index("ix_events_starts_at_id", "starts_at", "id"),
+    )
+
 
 # New Model for Order History in the separate database
 class OrderHistory(BaseHistory):
@@ -91,6 +110,40 @@ class OrderHistory(BaseHistory):
     # Total quantity of items in the order
     quantity = Column(Integer, nullable=False)
     total_amount = Column(Float, nullable=False)  # This will serve as total
-    order_date = Column(DateTime(timezone=True), server_default=func.now())
+    order_date = Column(DateTime(timezone=True).with_variant(SQLITE_TIMESTAMP, "sqlite"),
+                        server_default=func.now())
+    # Set for orders accepted through the write-behind queue; unique so a
+    # batch replayed after a crash cannot insert an order twice
+    reference = Column(String, unique=True)
+
+    __table_args__ = (
+        # Serves the newest-first keyset pagination of /orders
+        Index("ix_orders_history_order_date_id", "order_date", "id"),
+    )
+
     def __repr__(self):
         return f"<OrderHistory(id={self.id}, email='{self.email}', product='{self.product_title}')>"
+
+
+# Idempotency-Key sent with a POST /orders, the order it created and the
+# response it got, replayed for retries of the same key until expires_at
+class OrderIdempotencyKey(BaseHistory):
+    __tablename__ = "order_idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # sha256 of the order payload
+    order_id = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# Order totals per day and product, maintained by the order crud functions
+# when ORDER_ROLLUPS is enabled
+class OrderDailyRollup(BaseHistory):
+    __tablename__ = "orders_daily_rollup"
+
+    day = Column(Date, primary_key=True)
+    product_title = Column(String, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0)
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS pending_orders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    reference TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    accepted_at TEXT NOT NULL
+)"""
+
+# Longest pause between retries of a batch the history database refused
+MAX_RETRY_DELAY = 5.0
+
+
+def reference_for(idempotency_key: Optional[str]) -> str:
+    """
+    Order reference handed back on acceptance. Derived from the
+    Idempotency-Key when there is one, so a retry maps to the same order
+    whether it is still queued or already in orders_history. The reference
+    is permanent, so such keys do not expire after IDEMPOTENCY_KEY_TTL.
+    """
+    if idempotency_key is None:
+        return uuid.uuid4().hex
+    return hashlib.sha256(idempotency_key.encode()).hexdigest()[:32]
+
+
+class OrderQueue:
+    """
+    Durable write-behind queue in front of orders_history.
+
+    Accepted orders are appended to a local SQLite journal in WAL mode with
+    synchronous=NORMAL: a commit is a short append without an fsync, and
+    survives the process dying. A worker thread moves them to the history
+    database in batches of ORDER_QUEUE_BATCH_SIZE, one transaction each, at
+    least every ORDER_QUEUE_FLUSH_INTERVAL seconds. Rows leave the journal
+    only after their batch committed; a batch replayed after a crash is
+    deduplicated by the unique orders_history.reference.
+    """
+
+    def __init__(self, path: str, batch_size: int, flush_interval: float):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._since_flush = 0
+        self.pending = 0  # journaled and not yet flushed, kept without a COUNT(*)
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_batch_seconds = 0.0
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shared between threads; one each
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, reference: str, payload: str) -> bool:
+        """Journal an order; False when the reference is already queued."""
+        accepted_at = datetime.now(timezone.utc).isoformat()
+        try:
+            self._conn().execute(
+                "INSERT INTO pending_orders (reference, payload, accepted_at) VALUES (?, ?, ?)",
+                (reference, payload, accepted_at))
+        except sqlite3.IntegrityError:
+            return False
+        with self._lock:
+            self.enqueued += 1
+            self.pending += 1
+            self._since_flush += 1
+            if self._since_flush >= self.batch_size:
+                self._wake.set()
+        return True
+
+    def get(self, reference: str) -> Optional[str]:
+        """Payload of a still queued order."""
+        row = self._conn().execute(
+            "SELECT payload FROM pending_orders WHERE reference = ?", (reference,)).fetchone()
+        return row[0] if row else None
+
+    def flush(self) -> int:
+        """Move one batch to orders_history; returns the number of journal rows handled."""
+        from app import crud, schemas
+        from app.database import get_session_local_history
+
+        rows = self._conn().execute(
+            "SELECT seq, reference, payload, accepted_at FROM pending_orders ORDER BY seq LIMIT ?",
+            (self.batch_size,)).fetchall()
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        orders = [(reference, schemas.OrderHistoryCreate.model_validate_json(payload),
+                   datetime.fromisoformat(accepted_at)) for _, reference, payload, accepted_at in rows]
+        with get_session_local_history()() as db:
+            crud.create_orders_history_batch(db, orders)
+        self._conn().execute(
+            f"DELETE FROM pending_orders WHERE seq IN ({','.join('?' * len(rows))})", [row[0] for row in rows])
+        with self._lock:
+            self.flushed += len(rows)
+            self.pending = max(0, self.pending - len(rows))
+            self.batches += 1
+            self.last_batch_seconds = time.perf_counter() - started
+        return len(rows)
+
+    def drain(self):
+        """Flush until the journal is empty."""
+        while self.flush() == self.batch_size:
+            pass
+
+    def _run(self):
+        delay = self.flush_interval
+        while not self._stopping.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            with self._lock:
+                self._since_flush = 0
+            try:
+                self.drain()
+                delay = self.flush_interval
+            except Exception as e:
+                # Orders stay journaled; retry with backoff until the database is back
+                logger.exception("Flushing queued orders failed")
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                delay = min(max(delay, 0.1) * 2, MAX_RETRY_DELAY)
+
+    def start(self):
+        if self._thread is None:
+            # Orders journaled before a restart count towards the depth too
+            backlog = self._conn().execute("SELECT COUNT(*) FROM pending_orders").fetchone()[0]
+            with self._lock:
+                self.pending = backlog
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="order-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the worker after a final flush of everything journaled."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.drain()
+        except Exception:
+            logger.exception("Final flush of queued orders failed; they stay in %s", self.path)
+
+    def stats(self) -> dict:
+        depth, oldest = self._conn().execute(
+            "SELECT COUNT(*), MIN(accepted_at) FROM pending_orders").fetchone()
+        age = (datetime.now(timezone.utc) - datetime.fromisoformat(oldest)).total_seconds() if oldest else 0.0
+        with self._lock:
+            return {
+                "enabled": settings.ORDER_WRITE_BEHIND,
+                "running": self._thread is not None,
+                "depth": depth,
+                "oldest_age_seconds": round(age, 3),
+                "enqueued": self.enqueued,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "last_batch_seconds": round(self.last_batch_seconds, 6),
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+            }
+
+
+queue = OrderQueue(settings.ORDER_QUEUE_PATH, settings.ORDER_QUEUE_BATCH_SIZE, settings.ORDER_QUEUE_FLUSH_INTERVAL)
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import literal, tuple_
+
+
+def encode_cursor(*values) -> str:
+    """Opaque cursor for the sort key of the last row on a page."""
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Decode a cursor and coerce its values to `types`; raises ValueError if it does not fit."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("malformed cursor") from exc
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("cursor does not match this listing")
+    coerced = []
+    for value, kind in zip(values, types):
+        if kind is datetime and isinstance(value, str):
+            coerced.append(datetime.fromisoformat(value))
+        elif kind is int and isinstance(value, int) and not isinstance(value, bool):
+            coerced.append(value)
+        else:
+            raise ValueError("cursor does not match this listing")
+    return coerced
+
+
+def cursor_param(*types):
+    """Dependency parsing the `cursor` query parameter into typed sort-key values."""
+    def dependency(cursor: Optional[str] = Query(
+            None, description="Opaque cursor from X-Next-Cursor; replaces skip when given")):
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor, *types)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {exc}")
+    return dependency
+
+
+def paginate(query, columns, skip: int = 0, limit: int = 100, after: Optional[list] = None,
+             descending: bool = False):
+    """
+    Order `query` by `columns` and cut one page from it.
+
+    With `after` (decoded cursor values) the page starts strictly past that
+    sort key, so an index on `columns` serves it directly; otherwise the
+    legacy OFFSET is applied.
+    """
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    if after is not None:
+        # Bind with the column types so dialect-specific storage formats apply
+        key = tuple_(*columns)
+        bound = tuple_(*[literal(value, column.type) for column, value in zip(columns, after)])
+        query = query.filter(key < bound if descending else key > bound)
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, *keys: str):
+    """Advertise the cursor of the next page when this one came back full."""
+    if not rows or len(rows) < limit:
+        return
+    last = rows[-1]
+    values = [last[k] if isinstance(last, dict) else getattr(last, k) for k in keys]
+    response.headers["X-Next-Cursor"] = encode_cursor(*values)
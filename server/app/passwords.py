@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from app.config import settings
+
+
+@functools.lru_cache(maxsize=None)
+def password_context():
+    """
+    The passlib context, built on first use so cold starts serving only
+    public routes never import passlib and bcrypt.
+    """
+    from passlib.context import CryptContext
+
+    # Pinning min/max to the configured cost makes verify_and_update hand back a
+    # fresh hash whenever a stored hash was made with a different cost
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when more hashing jobs are waiting than PASSWORD_HASH_QUEUE allows."""
+
+
+class HashStats:
+    """Queue and run time counters of the password pool, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.in_flight = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+
+    def record(self, queued: float, ran: float):
+        with self._lock:
+            self.jobs += 1
+            self.queue_seconds_total += queued
+            self.queue_seconds_max = max(self.queue_seconds_max, queued)
+            self.run_seconds_total += ran
+            self.run_seconds_max = max(self.run_seconds_max, ran)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": settings.PASSWORD_HASH_WORKERS,
+                "max_queue": settings.PASSWORD_HASH_QUEUE,
+                "rounds": settings.BCRYPT_ROUNDS,
+                "in_flight": self.in_flight,
+                "jobs": self.jobs,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "queue_seconds_total": round(self.queue_seconds_total, 6),
+                "queue_seconds_max": round(self.queue_seconds_max, 6),
+                "queue_seconds_avg": round(self.queue_seconds_total / self.jobs, 6) if self.jobs else 0.0,
+                "run_seconds_total": round(self.run_seconds_total, 6),
+                "run_seconds_max": round(self.run_seconds_max, 6),
+                "run_seconds_avg": round(self.run_seconds_total / self.jobs, 6) if self.jobs else 0.0,
+            }
+
+
+stats = HashStats()
+
+# bcrypt releases the GIL while hashing, so a small thread pool keeps the
+# work off the event loop without the cost of pickling into worker processes
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _timed(submitted: float, fn, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        stats.record(started - submitted, time.perf_counter() - started)
+
+
+async def _run(fn, *args):
+    with stats._lock:
+        if stats.in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE:
+            stats.rejected += 1
+            raise PasswordPoolBusy()
+        stats.in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, _timed, time.perf_counter(), fn, *args)
+    finally:
+        with stats._lock:
+            stats.in_flight -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(password_context().hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password against its stored hash.
+
+    Returns (valid, new_hash); new_hash is set when the stored hash was made
+    with a different bcrypt cost and should replace it.
+    """
+    valid, new_hash = await _run(password_context().verify_and_update, password, password_hash)
+    if new_hash:
+        with stats._lock:
+            stats.rehashed += 1
+    return valid, new_hash
+
+
+def shutdown():
+    _executor.shutdown(wait=False)
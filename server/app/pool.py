@@ -0,0 +1,140 @@
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.config import settings
+
+
+# Recent checkout wait: a moving average of the last few checkouts that
+# halves every RECENT_WAIT_HALF_LIFE seconds without any, so it recovers
+# once load is shed instead of staying at its last value
+RECENT_WAIT_WEIGHT = 0.2
+RECENT_WAIT_HALF_LIFE = 2.0
+
+
+class PoolStats:
+    """Checkout counters for one connection pool, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._recent_wait = 0.0
+        self._recent_at = time.monotonic()
+
+    def _decayed(self, now: float) -> float:
+        return self._recent_wait * 0.5 ** ((now - self._recent_at) / RECENT_WAIT_HALF_LIFE)
+
+    def record(self, waited: float, timed_out: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self._recent_wait = self._decayed(now) * (1 - RECENT_WAIT_WEIGHT) + waited * RECENT_WAIT_WEIGHT
+            self._recent_at = now
+
+    def recent_wait(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_recent": round(self._decayed(time.monotonic()), 6),
+            }
+
+
+class TimedQueuePoolMixin:
+    """Records how long each checkout waited for a free (or new) connection."""
+
+    @property
+    def stats(self) -> PoolStats:
+        if "_stats" not in self.__dict__:
+            self._stats = PoolStats()
+        return self._stats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return conn
+
+
+class TimedQueuePool(TimedQueuePoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedQueuePoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Build create_engine/create_async_engine keyword arguments from settings.
+
+    DB_EXTERNAL_POOLER switches to NullPool so an external pooler such as
+    PgBouncer owns the connections; otherwise a timed QueuePool is used.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    connect_args = {}
+
+    if settings.DB_EXTERNAL_POOLER:
+        options["poolclass"] = NullPool
+        if is_async and backend == "postgresql":
+            # PgBouncer in transaction mode cannot keep prepared statements
+            connect_args["statement_cache_size"] = 0
+    elif backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        pass  # in-memory SQLite keeps its single-connection pool
+    else:
+        options.update(
+            poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": timeout}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def pool_status(engine) -> dict:
+    """Current occupancy and wait statistics of an engine's pool."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedQueuePoolMixin):
+        status.update(pool.stats.snapshot())
+    return status
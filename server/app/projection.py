@@ -0,0 +1,73 @@
+import functools
+from typing import List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from pydantic import ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import load_only, noload, selectinload
+
+
+class Projection(NamedTuple):
+    """Columns and relationships a listing was asked to return."""
+    fields: Tuple[str, ...]
+    include: Tuple[str, ...]
+    omit: Tuple[str, ...]  # relationships left unloaded
+
+    def options(self, model) -> list:
+        """Loader options selecting only the projected columns and relationships."""
+        options = [load_only(*[getattr(model, name) for name in self.fields])]
+        options += [selectinload(getattr(model, name)) for name in self.include]
+        options += [noload(getattr(model, name)) for name in self.omit]
+        return options
+
+
+def _split(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def projection_param(schema, relations: Tuple[str, ...] = (), required: Tuple[str, ...] = ("id",)):
+    """
+    Dependency parsing `fields` and `include` into a Projection.
+
+    `fields` lists the columns to return (relationship names are accepted
+    too) and `include` the relationships. `required` columns, such as the
+    pagination keys, are always returned. Gives None when neither parameter
+    is passed, so the full representation is served unchanged.
+    """
+    columns = [name for name in schema.model_fields if name not in relations]
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated fields to return: {', '.join(schema.model_fields)}"),
+        include: Optional[str] = Query(
+            None, description=f"Comma-separated relationships to load: {', '.join(relations) or 'none'}"),
+    ) -> Optional[Projection]:
+        if fields is None and include is None:
+            return None
+        requested = _split(fields) if fields is not None else list(columns)
+        included = {name for name in requested if name in relations}
+        included.update(_split(include or ""))
+        unknown = sorted(
+            {name for name in requested if name not in schema.model_fields}
+            | {name for name in included if name not in relations})
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+        selected = set(requested) | set(required)
+        return Projection(
+            fields=tuple(name for name in columns if name in selected),
+            include=tuple(name for name in relations if name in included),
+            omit=tuple(name for name in relations if name not in included),
+        )
+    return dependency
+
+
+@functools.lru_cache(maxsize=128)
+def projection_adapter(schema, projection: Projection) -> TypeAdapter:
+    """List adapter for a schema cut down to the projected fields."""
+    names = projection.fields + projection.include
+    partial = create_model(
+        f"{schema.__name__}Projection",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names},
+    )
+    return TypeAdapter(List[partial])
+
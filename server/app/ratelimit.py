@@ -0,0 +1,231 @@
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from app import auth, database, order_queue
+from app.config import settings
+
+
+class Budget(NamedTuple):
+    """A token bucket: `burst` requests at once, refilled at `rate` per second."""
+    rate: float
+    burst: int
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def parse(cls, spec: str) -> Optional["Budget"]:
+        """"10/60" is 10 requests per 60 seconds, all of them usable at once; "" is no limit."""
+        if not spec.strip():
+            return None
+        requests, _, seconds = spec.partition("/")
+        requests, seconds = int(requests), float(seconds or 1)
+        if requests <= 0 or seconds <= 0:
+            raise ValueError(f"Invalid rate limit '{spec}'")
+        return cls(requests / seconds, requests)
+
+
+class RateLimitBackend:
+    """
+    Storage of the token buckets.
+
+    `take` removes one token from the bucket at `key` and returns 0, or
+    leaves the bucket as it is and returns the seconds until a token is
+    available.
+    """
+
+    blocking = False  # True when take does network I/O and belongs in the threadpool
+
+    def take(self, key: str, budget: Budget) -> float:
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process buckets, bounded to `max_keys` clients by LRU. Each instance
+    counts on its own, so N instances let a client through N times as often.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, budget):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (budget.burst, now))
+            tokens = min(budget.burst, tokens + (now - updated_at) * budget.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / budget.rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # An evicted client starts over with a full bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+# Refill and take in one round trip, on the Redis clock so instances agree
+_TAKE_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = math.min(burst, (tonumber(state[1]) or burst) + (now - (tonumber(state[2]) or now)) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by all instances; requires the redis package."""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "iiec:ratelimit:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._prefix = prefix
+
+    def take(self, key, budget):
+        return float(self._take(keys=[self._prefix + key], args=[budget.rate, budget.burst]))
+
+
+def build_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.RATE_LIMIT_URL)
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{settings.RATE_LIMIT_BACKEND}'")
+
+
+def client_key(request: Request) -> str:
+    """
+    Who a request counts against: the user of a bearer token this instance
+    has validated before, otherwise the client address. Behind a proxy the
+    address comes from RATE_LIMIT_CLIENT_HEADER (first entry).
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        # Only the cache: an unknown token is not worth a JWT check here
+        claims = auth.token_cache.get(token)
+        if claims is not None:
+            return f"user:{claims['user_id']}"
+    address = None
+    if settings.RATE_LIMIT_CLIENT_HEADER:
+        forwarded = request.headers.get(settings.RATE_LIMIT_CLIENT_HEADER, "")
+        address = forwarded.split(",")[0].strip() or None
+    if address is None and request.client is not None:
+        address = request.client.host
+    return f"ip:{address or 'unknown'}"
+
+
+class Admission:
+    """
+    Per-route token buckets plus global load shedding for the endpoints that
+    collapse under bursts (bcrypt logins, order writes).
+
+    A client over its route budget gets 429. Any guarded request gets 503
+    while ADMISSION_MAX_IN_FLIGHT guarded requests are already running on
+    this instance, the recent connection pool wait exceeds
+    ADMISSION_MAX_POOL_WAIT, or the write-behind order queue is deeper than
+    ADMISSION_MAX_ORDER_QUEUE. Both carry Retry-After.
+    """
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = {}
+        self.limited = {}
+        self.shed = {}
+
+    def _count(self, counter: dict, name: str):
+        with self._lock:
+            counter[name] = counter.get(name, 0) + 1
+
+    def overload(self, route: str) -> Optional[str]:
+        """Why a request should be shed right now, or None."""
+        if 0 < settings.ADMISSION_MAX_IN_FLIGHT <= self.in_flight:
+            return "in_flight"
+        if settings.ADMISSION_MAX_POOL_WAIT > 0:
+            for engine in database.built_engines():
+                stats = getattr(engine.pool, "stats", None)
+                if stats is not None and stats.recent_wait() > settings.ADMISSION_MAX_POOL_WAIT:
+                    return "pool_wait"
+        if (route == "orders" and settings.ORDER_WRITE_BEHIND
+                and 0 < settings.ADMISSION_MAX_ORDER_QUEUE <= order_queue.queue.pending):
+            return "order_queue"
+        return None
+
+    def guard(self, route: str, budget_setting: str):
+        """
+        Dependency admitting a request to `route` under the budget in the
+        `budget_setting` setting and holding its in-flight slot until the
+        request is done.
+        """
+        async def admit(request: Request):
+            budget = Budget.parse(getattr(settings, budget_setting))
+            reason = self.overload(route)
+            if reason is not None:
+                self._count(self.shed, f"{route}:{reason}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, try again shortly",
+                    headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)})
+            if budget is not None:
+                key = f"{route}:{client_key(request)}"
+                if self.backend.blocking:
+                    wait = await run_in_threadpool(self.backend.take, key, budget)
+                else:
+                    wait = self.backend.take(key, budget)
+                if wait > 0:
+                    self._count(self.limited, route)
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail="Too many requests, try again later",
+                        headers={"Retry-After": str(math.ceil(wait))})
+            self._count(self.admitted, route)
+            with self._lock:
+                self.in_flight += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        return admit
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "in_flight": self.in_flight,
+                "max_in_flight": settings.ADMISSION_MAX_IN_FLIGHT,
+                "admitted": dict(self.admitted),
+                "limited": dict(self.limited),
+                "shed": dict(self.shed),
+            }
+
+
+admission = Admission(build_backend())
+
+login_limit = admission.guard("login", "RATE_LIMIT_LOGIN")
+orders_limit = admission.guard("orders", "RATE_LIMIT_ORDERS")
+images_limit = admission.guard("images", "RATE_LIMIT_IMAGES")
@@ -0,0 +1,50 @@
+import functools
+import json
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def type_adapter(tp) -> TypeAdapter:
+    """Adapter for a schema (or List[schema]), built once and reused for every request."""
+    return TypeAdapter(tp)
+
+
+def json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Return already JSON-ready data (such as cached listing pages) as is.
+
+    Returning a Response skips the route's response_model, which would
+    otherwise validate and re-serialize every row. Headers already set on
+    `response` (ETag, X-Next-Cursor) are carried over.
+    """
+    return FastJSONResponse(content, headers=dict(response.headers) if response is not None else None)
+
+
+def orm_response(adapter: TypeAdapter, content: Any, response: Optional[Response] = None) -> Response:
+    """
+    Serialize ORM rows straight to JSON bytes with a precompiled adapter.
+
+    Validation reads the attributes once and pydantic-core writes the JSON,
+    instead of building intermediate dicts and encoding them again.
+    """
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(body, media_type="application/json",
+                    headers=dict(response.headers) if response is not None else None)
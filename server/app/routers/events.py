@@ -1,8 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from app import crud, schemas
-from app.database import get_db
+from app.bulk import missing_id_errors, validate_items
+from app.conditional import Validators
+from app.database import DbSession, get_db, run_db
+from app.event_dates import local_today, to_local
+from app.images import image_width_param, with_variants
+from app.pagination import cursor_param, set_next_cursor
+from app.projection import Projection, projection_param
+from app.responses import json_response, orm_response, type_adapter
 
 router = APIRouter(
     prefix="/events",
@@ -11,40 +18,117 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[schemas.Event])
-def get_events(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all events with pagination"""
-    events = crud.get_events(db, skip=skip, limit=limit)
-    return events
+async def get_events(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    start: Optional[datetime] = Query(None, alias="from", description="Only events starting at or after this date/time"),
+    end: Optional[datetime] = Query(None, alias="to", description="Only events starting before this date/time"),
+    upcoming: bool = Query(False, description="Only events from today on"),
+    past: bool = Query(False, description="Only events before today"),
+    location: Optional[str] = Query(None, description="Case-insensitive part of the location"),
+    sort: str = Query("id", pattern="^(" + "|".join(crud.EVENT_SORTS) + ")$",
+                      description="id, date (soonest first) or -date (latest first)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; replaces skip when given"),
+    projection: Optional[Projection] = Depends(projection_param(schemas.Event, required=("id", "starts_at"))),
+    image_width: Optional[int] = Depends(image_width_param),
+    db: DbSession = Depends(get_db)
+):
+    """Get events with pagination, filtered by start date and location and sorted in SQL"""
+    if upcoming and past:
+        raise HTTPException(status_code=400, detail="upcoming and past cannot be combined")
+    start, end = to_local(start), to_local(end)
+    # Resolve today here so the cache key and ETag change with the date
+    today = local_today()
+    if upcoming:
+        start = today if start is None else max(start, today)
+    if past:
+        end = today if end is None else min(end, today)
+    keys, _ = crud.EVENT_SORTS[sort]
+    after = cursor_param(*[datetime if key == "starts_at" else int for key in keys])(cursor)
+
+    fingerprint = await run_db(db, crud.get_events_fingerprint)
+    events = await run_db(
+        db, crud.get_events, skip=skip, limit=limit, after=after, projection=projection,
+        start=start, end=end, location=location, sort=sort)
+    validators = Validators.for_listing(
+        "events", fingerprint, events, skip, limit, after, projection, start, end, location, sort, image_width)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    set_next_cursor(response, events, limit, *keys)
+    return json_response(with_variants(events, image_width), response)
+
+
+# Bulk endpoints: declared before the /{id} routes so "bulk" is not read as an id
+@router.post("/bulk", response_model=schemas.BulkResult[schemas.Event])
+async def bulk_create_events(
+    items: List[Any] = Body(...),
+    db: DbSession = Depends(get_db)
+):
+    """Create many events in one transaction; invalid items are reported, not inserted"""
+    valid, errors = validate_items(items, schemas.EventCreate)
+    rows = await run_db(db, crud.bulk_create_events, [item for _, item in valid])
+    return {"items": rows, "errors": errors}
+
+
+@router.put("/bulk", response_model=schemas.BulkResult[schemas.Event])
+async def bulk_update_events(items: List[Any] = Body(...), db: DbSession = Depends(get_db)):
+    """Apply partial updates to many events by id in one transaction"""
+    valid, errors = validate_items(items, schemas.EventBulkUpdate)
+    rows, missing = await run_db(db, crud.bulk_update_events, [item for _, item in valid])
+    errors += missing_id_errors(valid, missing, "Event not found")
+    return {"items": rows, "errors": sorted(errors, key=lambda e: e.index)}
+
+
+@router.delete("/bulk", response_model=schemas.BulkDeleteResult)
+async def bulk_delete_events(ids: List[int] = Body(...), db: DbSession = Depends(get_db)):
+    """Delete many events by id in one statement"""
+    deleted = await run_db(db, crud.bulk_delete_events, ids)
+    found = set(deleted)
+    errors = [schemas.BulkItemError(index=i, id=item_id, detail="Event not found")
+              for i, item_id in enumerate(ids) if item_id not in found]
+    return {"deleted": deleted, "errors": errors}
 
 
 @router.get("/{event_id}", response_model=schemas.Event)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+async def get_event(
+    event_id: int,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
     """Get a specific event by ID"""
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run_db(db, crud.get_event, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    return db_event
+    validators = Validators.for_item("events", db_event)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    return orm_response(type_adapter(schemas.Event), db_event, response)
 
 
 @router.post("/", response_model=schemas.Event)
-def create_event(event: schemas.EventCreate, db: Session = Depends(get_db)):
+async def create_event(event: schemas.EventCreate, db: DbSession = Depends(get_db)):
     """Create a new event"""
-    return crud.create_event(db=db, event=event)
+    return await run_db(db, crud.create_event, event=event)
 
 
 @router.put("/{event_id}", response_model=schemas.Event)
-def update_event(event_id: int, event: schemas.EventUpdate, db: Session = Depends(get_db)):
+async def update_event(event_id: int, event: schemas.EventUpdate, db: DbSession = Depends(get_db)):
     """Update an existing event"""
-    db_event = crud.update_event(db, event_id=event_id, event_update=event)
+    db_event = await run_db(db, crud.update_event, event_id=event_id, event_update=event)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     return db_event
 
 
 @router.delete("/{event_id}")
-def delete_event(event_id: int, db: Session = Depends(get_db)):
+async def delete_event(event_id: int, db: DbSession = Depends(get_db)):
     """Delete an event"""
-    db_event = crud.delete_event(db, event_id=event_id)
+    db_event = await run_db(db, crud.delete_event, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     return {"message": "Event deleted successfully"}
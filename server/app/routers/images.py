@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app import schemas
+from app.config import settings
+from app.images import (CONTENT_TYPES, HAS_PILLOW, IMMUTABLE, NAME, InvalidImage, images, variant_name,
+                        variant_widths)
+from app.ratelimit import images_limit
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+
+def image_url(request: Request, name: str) -> str:
+    if settings.IMAGE_PUBLIC_URL:
+        return f"{settings.IMAGE_PUBLIC_URL.rstrip('/')}/images/{name}"
+    return str(request.url_for("read_image", name=name))
+
+
+@router.post("/", response_model=schemas.ImageUpload, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(images_limit)])
+async def upload_image(request: Request, file: UploadFile = File(...)):
+    """
+    Store a JPEG, PNG, GIF or WebP image under the hash of its content.
+
+    Use `url` in image fields. The WebP `variants` by width are rendered in
+    the background; listings return them with `image_width`.
+    """
+    # One byte over the limit is enough to reject without reading everything
+    data = await file.read(settings.IMAGE_MAX_BYTES + 1)
+    if len(data) > settings.IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Images are limited to {settings.IMAGE_MAX_BYTES} bytes")
+    try:
+        stored = await run_in_threadpool(images.save, data)
+    except InvalidImage as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    variants = {}
+    if HAS_PILLOW:
+        variants = {width: image_url(request, variant_name(stored.digest, width)) for width in variant_widths()}
+    return {"id": stored.digest, "url": image_url(request, stored.name), "variants": variants}
+
+
+@router.get("/{name}", name="read_image")
+async def read_image(name: str, request: Request):
+    """An original or variant; names are content hashes, so responses are cached for good"""
+    match = NAME.match(name)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    etag = f'"{name}"'
+    headers = {"Cache-Control": IMMUTABLE, "ETag": etag}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    data = await run_in_threadpool(images.read, name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(data, media_type=CONTENT_TYPES[match["ext"]], headers=headers)
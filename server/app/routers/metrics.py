@@ -0,0 +1,78 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import auth, database, order_queue, passwords
+from app.compression import compressed_bodies
+from app.images import images
+from app.instrumentation import registry
+from app.cache import listing_cache
+from app.pool import pool_status
+from app.ratelimit import admission
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("", response_class=PlainTextResponse)
+def read_metrics():
+    """Per-route request latency, SQL and response size metrics in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/pool")
+def read_pool_metrics():
+    """Connection pool occupancy and checkout wait times per engine built so far"""
+    factories = {
+        "primary": database.get_engine,
+        "history": database.get_engine_history,
+        "primary_async": database.get_async_engine,
+        "history_async": database.get_async_engine_history,
+    }
+    pools = {}
+    for name, factory in factories.items():
+        # Reading database.engine would build an engine this process never uses
+        engine = database.built(factory)
+        if engine is not None:
+            pools[name] = pool_status(getattr(engine, "sync_engine", engine))
+    return pools
+
+
+@router.get("/cache")
+def read_cache_metrics():
+    """Hit and miss counters of the listing cache"""
+    return listing_cache.stats()
+
+
+@router.get("/passwords")
+def read_password_metrics():
+    """Queue and hashing times of the bcrypt worker pool"""
+    return passwords.stats.snapshot()
+
+
+@router.get("/auth")
+def read_auth_metrics():
+    """Hit and miss counters of the validated token cache"""
+    return auth.token_cache.stats()
+
+
+@router.get("/orders-queue")
+def read_order_queue_metrics():
+    """Depth, age and flush counters of the write-behind order queue"""
+    return order_queue.queue.stats()
+
+
+@router.get("/compression")
+def read_compression_metrics():
+    """Bytes in and out, compression time and reuse of compressed bodies"""
+    return compressed_bodies.stats()
+
+
+@router.get("/admission")
+def read_admission_metrics():
+    """Requests admitted, rate limited (429) and shed (503) on the guarded endpoints"""
+    return admission.stats()
+
+
+@router.get("/images")
+def read_image_metrics():
+    """Uploads and rendered variants of the image store"""
+    return images.stats()
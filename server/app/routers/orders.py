@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timezone
+from typing import List, Optional
+import csv
+import hashlib
+import io
+import json
 
-from app import crud, schemas
-from app.database import get_product_db  # Use the history DB session
+from app import crud, order_queue, schemas
+from app.config import settings
+from app.database import DbSession, get_product_db, run_db, stream_db  # Use the history DB session
+from app.pagination import cursor_param, set_next_cursor
+from app.projection import Projection, projection_adapter, projection_param
+from app.ratelimit import orders_limit
+from app.responses import orm_response, type_adapter
 
 router = APIRouter(
     prefix="/orders",
@@ -11,41 +22,202 @@ router = APIRouter(
 )
 
 
-@router.post("/", response_model=schemas.OrderHistory)
-def create_order(order: schemas.OrderHistoryCreate, db: Session = Depends(get_product_db)):
+@router.post("/", response_model=schemas.OrderHistory, dependencies=[Depends(orders_limit)])
+async def create_order(
+    order: schemas.OrderHistoryCreate,
+    idempotency_key: Optional[str] = Header(
+        None, min_length=1, max_length=255,
+        description="Client-chosen key; retries with the same key return the first response"),
+    db: DbSession = Depends(get_product_db)
+):
     """
     Create a new order history entry.
+
+    With an Idempotency-Key header the order is created once per key: a
+    retry, or a duplicate racing the first request, gets the original
+    response back with `Idempotent-Replayed: true`. Reusing a key for a
+    different order is rejected with 422.
+
+    With ORDER_WRITE_BEHIND the order is validated, journaled and answered
+    with 202 and a reference right away; GET /orders/reference/{reference}
+    returns it once the background worker has written it. A key then names
+    its order for good (IDEMPOTENCY_KEY_TTL does not apply), and a replay
+    reports whether the order is still queued or already written.
     """
-    return crud.create_order_history(db=db, order=order)
+    if settings.ORDER_WRITE_BEHIND:
+        return await _enqueue_order(order, idempotency_key, db)
+    if idempotency_key is None:
+        return await run_db(db, crud.create_order_history, order=order)
+    request_hash = hashlib.sha256(order.model_dump_json().encode()).hexdigest()
+    record, replayed = await run_db(
+        db, crud.create_order_history_once, order=order, key=idempotency_key, request_hash=request_hash)
+    if record.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different order")
+    return Response(record.response, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true" if replayed else "false"})
+
+
+def _accepted(reference: str, replayed: Optional[bool], status: str = "queued") -> JSONResponse:
+    headers = {"Location": f"/orders/reference/{reference}"}
+    if replayed is not None:
+        headers["Idempotent-Replayed"] = "true" if replayed else "false"
+    return JSONResponse(
+        schemas.OrderAccepted(reference=reference, status=status).model_dump(), status_code=202, headers=headers)
+
+
+async def _enqueue_order(order: schemas.OrderHistoryCreate, idempotency_key: Optional[str], db: DbSession):
+    reference = order_queue.reference_for(idempotency_key)
+    payload = order.model_dump_json()
+    if idempotency_key is not None:
+        # A retry of an order the worker already wrote
+        existing = await run_db(db, crud.get_order_history_by_reference, reference=reference)
+        if existing is not None:
+            if schemas.OrderHistoryCreate.model_validate(existing, from_attributes=True).model_dump_json() != payload:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different order")
+            return _accepted(reference, replayed=True, status="written")
+    if not await run_in_threadpool(order_queue.queue.enqueue, reference, payload):
+        # Same key while still queued (the reference is unique in the journal)
+        if await run_in_threadpool(order_queue.queue.get, reference) != payload:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different order")
+        return _accepted(reference, replayed=True)
+    return _accepted(reference, replayed=False if idempotency_key is not None else None)
 
 
 @router.get("/", response_model=List[schemas.OrderHistory])
-def read_orders_history(skip: int = 0, limit: int = 100, db: Session = Depends(get_product_db)):
+async def read_orders_history(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[list] = Depends(cursor_param(datetime, int)),
+    projection: Optional[Projection] = Depends(
+        projection_param(schemas.OrderHistory, required=("id", "order_date"))),
+    db: DbSession = Depends(get_product_db)
+):
+    """
+    Retrieve order history entries, newest first.
+
+    Pass the X-Next-Cursor header of a page back as `cursor` to fetch the
+    next one without OFFSET, and `fields` to return only some columns.
+    """
+    orders = await run_db(
+        db, crud.get_orders_history, skip=skip, limit=limit, after=after, projection=projection)
+    set_next_cursor(response, orders, limit, "order_date", "id")
+    if projection is not None:
+        return orm_response(projection_adapter(schemas.OrderHistory, projection), orders, response)
+    return orm_response(type_adapter(List[schemas.OrderHistory]), orders, response)
+
+
+EXPORT_COLUMNS = ["id", "order_date", "full_name", "email", "contact",
+                  "product_title", "quantity", "total_amount"]
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # order_date is stored in UTC; SQLite compares it as naive text
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def _ndjson_lines(batches):
+    async for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in rows)
+
+
+async def _csv_lines(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():  # header only, when nothing matched
+        yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_orders_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: DbSession = Depends(get_product_db)
+):
+    """
+    Stream orders placed in [start, end) as NDJSON or CSV, oldest first.
+
+    Rows are fetched in batches and written out as they arrive, so memory use
+    does not grow with the size of the export.
+    """
+    # The session dependency is closed only after the response has been sent
+    batches = stream_db(db, crud.get_orders_history_export_query(_utc(start), _utc(end)))
+    if format == "csv":
+        return StreamingResponse(
+            _csv_lines(batches), media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="orders.csv"'})
+    return StreamingResponse(_ndjson_lines(batches), media_type="application/x-ndjson")
+
+
+@router.get("/stats", response_model=schemas.OrderStats)
+async def read_order_stats(
+    group_by: Optional[str] = Query(None, pattern="^(" + "|".join(crud.ORDER_STATS_GROUPS) + ")$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: DbSession = Depends(get_product_db)
+):
+    """
+    Order count, quantity and revenue totals, optionally grouped by product,
+    customer or a day/week/month bucket, computed in SQL.
+    """
+    return await run_db(
+        db, crud.get_order_stats, group_by=group_by, start=_utc(start), end=_utc(end), limit=limit)
+
+
+@router.post("/stats/rebuild")
+async def rebuild_order_stats(db: DbSession = Depends(get_product_db)):
+    """
+    Recompute the daily rollup table from orders_history, e.g. after turning
+    ORDER_ROLLUPS on for a database that already has orders.
+    """
+    rows = await run_db(db, crud.rebuild_order_rollups)
+    return {"message": "Order rollups rebuilt", "rows": rows}
+
+
+@router.get("/reference/{reference}", response_model=schemas.OrderHistory,
+            responses={202: {"model": schemas.OrderAccepted}})
+async def read_order_by_reference(reference: str, db: DbSession = Depends(get_product_db)):
     """
-    Retrieve order history entries.
+    Look up an order by the reference POST /orders returned: the order once
+    written, 202 while it is still queued.
     """
-    orders = crud.get_orders_history(db, skip=skip, limit=limit)
-    return orders
+    db_order = await run_db(db, crud.get_order_history_by_reference, reference=reference)
+    if db_order is not None:
+        return orm_response(type_adapter(schemas.OrderHistory), db_order)
+    if settings.ORDER_WRITE_BEHIND and await run_in_threadpool(order_queue.queue.get, reference) is not None:
+        return _accepted(reference, replayed=None)
+    raise HTTPException(status_code=404, detail="Order not found")
 
 
 @router.get("/{order_id}", response_model=schemas.OrderHistory)
-def read_order_history(order_id: int, db: Session = Depends(get_product_db)):
+async def read_order_history(order_id: int, db: DbSession = Depends(get_product_db)):
     """
     Retrieve a specific order history entry by ID.
     """
-    db_order = crud.get_order_history(db, order_id=order_id)
+    db_order = await run_db(db, crud.get_order_history, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return db_order
+    return orm_response(type_adapter(schemas.OrderHistory), db_order)
 
 
 @router.patch("/{order_id}", response_model=schemas.OrderHistory)
-def update_order(order_id: int, order_update: schemas.OrderHistoryUpdate, db: Session = Depends(get_product_db)):
+async def update_order(order_id: int, order_update: schemas.OrderHistoryUpdate, db: DbSession = Depends(get_product_db)):
     """
     Update an order.
     """
-    updated_order = crud.update_order_history(
-        db, order_id=order_id, order_update=order_update)
+    updated_order = await run_db(
+        db, crud.update_order_history, order_id=order_id, order_update=order_update)
     if updated_order is None:
         raise HTTPException(
             status_code=404, detail="Order not found or no update performed")
@@ -54,11 +226,11 @@ def update_order(order_id: int, order_update: schemas.OrderHistoryUpdate, db: Se
 
 # status_code 204 for successful deletion with no content response
 @router.delete("/{order_id}", status_code=204)
-def delete_order(order_id: int, db: Session = Depends(get_product_db)):
+async def delete_order(order_id: int, db: DbSession = Depends(get_product_db)):
     """
     Delete an order by ID.
     """
-    deleted_order = crud.delete_order_history(db, order_id=order_id)
+    deleted_order = await run_db(db, crud.delete_order_history, order_id=order_id)
     if deleted_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     # Or return Response(status_code=204)
@@ -1,48 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from typing import Any, List, Optional
 
 from app import crud, schemas
-from app.database import get_product_db
+from app.bulk import missing_id_errors, validate_items
+from app.conditional import Validators
+from app.database import DbSession, get_product_db, run_db
+from app.images import image_width_param, with_variants
+from app.pagination import cursor_param, set_next_cursor
+from app.projection import Projection, projection_param
+from app.responses import json_response, orm_response, type_adapter
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
 @router.post("/", response_model=schemas.Product)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_product_db)):
-    return crud.create_product(db=db, product=product)
+async def create_product(product: schemas.ProductCreate, db: DbSession = Depends(get_product_db)):
+    return await run_db(db, crud.create_product, product=product)
 
 
 @router.get("/", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_product_db)):
-    products = crud.get_products(db, skip=skip, limit=limit)
-    return products
+async def read_products(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[list] = Depends(cursor_param(int)),
+    projection: Optional[Projection] = Depends(projection_param(schemas.Product)),
+    image_width: Optional[int] = Depends(image_width_param),
+    db: DbSession = Depends(get_product_db)
+):
+    fingerprint = await run_db(db, crud.get_products_fingerprint)
+    products = await run_db(db, crud.get_products, skip=skip, limit=limit, after=after, projection=projection)
+    validators = Validators.for_listing(
+        "products", fingerprint, products, skip, limit, after, projection, image_width)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    set_next_cursor(response, products, limit, "id")
+    return json_response(with_variants(products, image_width), response)
+
+
+# Bulk endpoints: declared before the /{id} routes so "bulk" is not read as an id
+@router.post("/bulk", response_model=schemas.BulkResult[schemas.Product])
+async def bulk_create_products(
+    items: List[Any] = Body(...),
+    db: DbSession = Depends(get_product_db)
+):
+    """Create many products in one transaction; invalid items are reported, not inserted"""
+    valid, errors = validate_items(items, schemas.ProductCreate)
+    rows = await run_db(db, crud.bulk_create_products, [item for _, item in valid])
+    return {"items": rows, "errors": errors}
+
+
+@router.put("/bulk", response_model=schemas.BulkResult[schemas.Product])
+async def bulk_update_products(items: List[Any] = Body(...), db: DbSession = Depends(get_product_db)):
+    """Apply partial updates to many products by id in one transaction"""
+    valid, errors = validate_items(items, schemas.ProductBulkUpdate)
+    rows, missing = await run_db(db, crud.bulk_update_products, [item for _, item in valid])
+    errors += missing_id_errors(valid, missing, "Product not found")
+    return {"items": rows, "errors": sorted(errors, key=lambda e: e.index)}
+
+
+@router.delete("/bulk", response_model=schemas.BulkDeleteResult)
+async def bulk_delete_products(ids: List[int] = Body(...), db: DbSession = Depends(get_product_db)):
+    """Delete many products by id in one statement"""
+    deleted = await run_db(db, crud.bulk_delete_products, ids)
+    found = set(deleted)
+    errors = [schemas.BulkItemError(index=i, id=item_id, detail="Product not found")
+              for i, item_id in enumerate(ids) if item_id not in found]
+    return {"deleted": deleted, "errors": errors}
 
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def read_product(product_id: int, db: Session = Depends(get_product_db)):
-    db_product = crud.get_product(db, product_id=product_id)
+async def read_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_product_db)
+):
+    db_product = await run_db(db, crud.get_product, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return db_product
+    validators = Validators.for_item("products", db_product)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    return orm_response(type_adapter(schemas.Product), db_product, response)
 
 
 @router.put("/{product_id}", response_model=schemas.Product)
-def update_product(
+async def update_product(
     product_id: int,
     product_update: schemas.ProductUpdate,
-    db: Session = Depends(get_product_db)
+    db: DbSession = Depends(get_product_db)
 ):
-    db_product = crud.update_product(
-        db, product_id=product_id, product_update=product_update)
+    db_product = await run_db(
+        db, crud.update_product, product_id=product_id, product_update=product_update)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
 
 
 @router.delete("/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_product_db)):
-    db_product = crud.delete_product(db, product_id=product_id)
+async def delete_product(product_id: int, db: DbSession = Depends(get_product_db)):
+    db_product = await run_db(db, crud.delete_product, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return {"message": "Product deleted successfully"}
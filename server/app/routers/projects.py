@@ -1,48 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from typing import Any, List, Optional
 
 from app import crud, schemas
-from app.database import get_db
+from app.bulk import missing_id_errors, validate_items
+from app.conditional import Validators
+from app.database import DbSession, get_db, run_db
+from app.images import image_width_param, with_variants
+from app.pagination import cursor_param, set_next_cursor
+from app.projection import Projection, projection_param
+from app.responses import json_response, orm_response, type_adapter
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 @router.post("/", response_model=schemas.Project)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
-    return crud.create_project(db=db, project=project)
+async def create_project(project: schemas.ProjectCreate, db: DbSession = Depends(get_db)):
+    return await run_db(db, crud.create_project, project=project)
 
 
 @router.get("/", response_model=List[schemas.Project])
-def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    projects = crud.get_projects(db, skip=skip, limit=limit)
-    return projects
+async def read_projects(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[list] = Depends(cursor_param(int)),
+    projection: Optional[Projection] = Depends(projection_param(schemas.Project, relations=("sections",))),
+    image_width: Optional[int] = Depends(image_width_param),
+    db: DbSession = Depends(get_db)
+):
+    fingerprint = await run_db(db, crud.get_projects_fingerprint)
+    projects = await run_db(db, crud.get_projects, skip=skip, limit=limit, after=after, projection=projection)
+    validators = Validators.for_listing(
+        "projects", fingerprint, projects, skip, limit, after, projection, image_width)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    set_next_cursor(response, projects, limit, "id")
+    return json_response(with_variants(projects, image_width), response)
 
 
 @router.get("/{project_id}", response_model=schemas.Project)
-def read_project(project_id: int, db: Session = Depends(get_db)):
-    db_project = crud.get_project(db, project_id=project_id)
+async def read_project(
+    project_id: int,
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_db)
+):
+    db_project = await run_db(db, crud.get_project, project_id=project_id)
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return db_project
+    validators = Validators.for_item("projects", db_project, db_project.sections)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    return orm_response(type_adapter(schemas.Project), db_project, response)
 
 
 @router.put("/{project_id}", response_model=schemas.Project)
-def update_project(
+async def update_project(
     project_id: int,
     project_update: schemas.ProjectUpdate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    db_project = crud.update_project(
-        db, project_id=project_id, project_update=project_update)
+    db_project = await run_db(
+        db, crud.update_project, project_id=project_id, project_update=project_update)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return db_project
+
+
+# Nested writes: the project and its complete section list in one transaction
+def _tree_errors(rejected: List[int]):
+    return [{"type": "value_error", "loc": ["body", "sections", index, "id"],
+             "msg": "Not a section of this project, or listed twice"} for index in rejected]
+
+
+@router.post("/tree", response_model=schemas.Project)
+async def create_project_tree(tree: schemas.ProjectTree, db: DbSession = Depends(get_db)):
+    """Create a project with all its sections; sections must not carry ids"""
+    db_project, rejected = await run_db(db, crud.save_project_tree, tree=tree)
+    if rejected:
+        raise HTTPException(status_code=422, detail=_tree_errors(rejected))
+    return db_project
+
+
+@router.put("/{project_id}/tree", response_model=schemas.Project)
+async def replace_project_tree(project_id: int, tree: schemas.ProjectTree, db: DbSession = Depends(get_db)):
+    """
+    Replace a project and its section list: sections with an id are updated,
+    new ones inserted and the ones left out deleted
+    """
+    db_project, rejected = await run_db(db, crud.save_project_tree, tree=tree, project_id=project_id)
+    if rejected:
+        raise HTTPException(status_code=422, detail=_tree_errors(rejected))
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     return db_project
 
 
 @router.delete("/{project_id}")
-def delete_project(project_id: int, db: Session = Depends(get_db)):
-    db_project = crud.delete_project(db, project_id=project_id)
+async def delete_project(project_id: int, db: DbSession = Depends(get_db)):
+    db_project = await run_db(db, crud.delete_project, project_id=project_id)
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     return {"message": "Project deleted successfully"}
@@ -50,61 +109,94 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
 
 # Project Sections endpoints
 @router.post("/{project_id}/sections", response_model=schemas.ProjectSection)
-def create_project_section(
+async def create_project_section(
     project_id: int,
     section: schemas.ProjectSectionCreate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Verify project exists
-    db_project = crud.get_project(db, project_id=project_id)
-    if db_project is None:
+    if not await run_db(db, crud.project_exists, project_id=project_id):
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Set the project_id from URL
     section.project_id = project_id
-    return crud.create_project_section(db=db, section=section)
+    return await run_db(db, crud.create_project_section, section=section)
 
 
 @router.get("/{project_id}/sections", response_model=List[schemas.ProjectSection])
-def read_project_sections(
+async def read_project_sections(
     project_id: int,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Verify project exists
-    db_project = crud.get_project(db, project_id=project_id)
-    if db_project is None:
+    if not await run_db(db, crud.project_exists, project_id=project_id):
         raise HTTPException(status_code=404, detail="Project not found")
     
-    sections = crud.get_project_sections(db, project_id=project_id, skip=skip, limit=limit)
-    return sections
+    sections = await run_db(
+        db, crud.get_project_sections, project_id=project_id, skip=skip, limit=limit)
+    return orm_response(type_adapter(List[schemas.ProjectSection]), sections)
+
+
+# Bulk section endpoints: declared before /sections/{section_id} so "bulk" is not read as an id
+@router.post("/{project_id}/sections/bulk", response_model=schemas.BulkResult[schemas.ProjectSection])
+async def bulk_create_project_sections(
+    project_id: int,
+    items: List[Any] = Body(...),
+    db: DbSession = Depends(get_db)
+):
+    """Create many project sections in one transaction; invalid items are reported, not inserted"""
+    if not await run_db(db, crud.project_exists, project_id=project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    valid, errors = validate_items(items, schemas.ProjectSectionCreate, project_id=project_id)
+    rows = await run_db(db, crud.bulk_create_project_sections, [item for _, item in valid])
+    return {"items": rows, "errors": errors}
+
+
+@router.put("/sections/bulk", response_model=schemas.BulkResult[schemas.ProjectSection])
+async def bulk_update_project_sections(items: List[Any] = Body(...), db: DbSession = Depends(get_db)):
+    """Apply partial updates to many project sections by id in one transaction"""
+    valid, errors = validate_items(items, schemas.ProjectSectionBulkUpdate)
+    rows, missing = await run_db(db, crud.bulk_update_project_sections, [item for _, item in valid])
+    errors += missing_id_errors(valid, missing, "Project section not found")
+    return {"items": rows, "errors": sorted(errors, key=lambda e: e.index)}
+
+
+@router.delete("/sections/bulk", response_model=schemas.BulkDeleteResult)
+async def bulk_delete_project_sections(ids: List[int] = Body(...), db: DbSession = Depends(get_db)):
+    """Delete many project sections by id in one statement"""
+    deleted = await run_db(db, crud.bulk_delete_project_sections, ids)
+    found = set(deleted)
+    errors = [schemas.BulkItemError(index=i, id=item_id, detail="Project section not found")
+              for i, item_id in enumerate(ids) if item_id not in found]
+    return {"deleted": deleted, "errors": errors}
 
 
 @router.get("/sections/{section_id}", response_model=schemas.ProjectSection)
-def read_project_section(section_id: int, db: Session = Depends(get_db)):
-    db_section = crud.get_project_section(db, section_id=section_id)
+async def read_project_section(section_id: int, db: DbSession = Depends(get_db)):
+    db_section = await run_db(db, crud.get_project_section, section_id=section_id)
     if db_section is None:
         raise HTTPException(status_code=404, detail="Project section not found")
-    return db_section
+    return orm_response(type_adapter(schemas.ProjectSection), db_section)
 
 
 @router.put("/sections/{section_id}", response_model=schemas.ProjectSection)
-def update_project_section(
+async def update_project_section(
     section_id: int,
     section_update: schemas.ProjectSectionUpdate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    db_section = crud.update_project_section(
-        db, section_id=section_id, section_update=section_update)
+    db_section = await run_db(
+        db, crud.update_project_section, section_id=section_id, section_update=section_update)
     if db_section is None:
         raise HTTPException(status_code=404, detail="Project section not found")
     return db_section
 
 
 @router.delete("/sections/{section_id}")
-def delete_project_section(section_id: int, db: Session = Depends(get_db)):
-    db_section = crud.delete_project_section(db, section_id=section_id)
+async def delete_project_section(section_id: int, db: DbSession = Depends(get_db)):
+    db_section = await run_db(db, crud.delete_project_section, section_id=section_id)
     if db_section is None:
         raise HTTPException(status_code=404, detail="Project section not found")
     return {"message": "Project section deleted successfully"}
\ No newline at end of file
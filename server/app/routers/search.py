@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+
+from app import schemas, search
+from app.database import DbSession, get_db, get_product_db, run_db
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+KIND_PATTERN = "^(" + "|".join(search.SEARCH_FIELDS) + ")(,(" + "|".join(search.SEARCH_FIELDS) + "))*$"
+
+
+def _requested_kinds(kinds: Optional[str]) -> List[str]:
+    return kinds.split(",") if kinds else list(search.SEARCH_FIELDS)
+
+
+@router.get("/", response_model=List[schemas.SearchHit])
+async def search_content(
+    q: str = Query(..., min_length=1, max_length=200),
+    kinds: Optional[str] = Query(None, pattern=KIND_PATTERN,
+                                 description="Comma separated subset of project,section,event,product"),
+    limit: int = Query(20, ge=1, le=100),
+    db: DbSession = Depends(get_db),
+    product_db: DbSession = Depends(get_product_db)
+):
+    """
+    Keyword search over projects, project sections, events and products,
+    ranked by relevance with highlighted snippets.
+    """
+    requested = _requested_kinds(kinds)
+    primary = [k for k in requested if k not in search.HISTORY_KINDS]
+    history = [k for k in requested if k in search.HISTORY_KINDS]
+    hits = []
+    if primary:
+        hits += await run_db(db, search.search, q, primary, limit)
+    if history:
+        hits += await run_db(product_db, search.search, q, history, limit)
+    # Scores from the two databases are both higher-is-better but not calibrated
+    # against each other; this interleaves them well enough for a short list
+    return sorted(hits, key=lambda hit: hit["score"], reverse=True)[:limit]
+
+
+@router.post("/rebuild")
+async def rebuild_search_index(
+    kinds: Optional[str] = Query(None, pattern=KIND_PATTERN),
+    db: DbSession = Depends(get_db),
+    product_db: DbSession = Depends(get_product_db)
+):
+    """Reindex every row, e.g. after rows were changed outside the API"""
+    requested = _requested_kinds(kinds)
+    primary = [k for k in requested if k not in search.HISTORY_KINDS]
+    history = [k for k in requested if k in search.HISTORY_KINDS]
+    documents = 0
+    if primary:
+        documents += await run_db(db, search.rebuild, primary)
+    if history:
+        documents += await run_db(product_db, search.rebuild, history)
+    return {"message": "Search index rebuilt", "documents": documents}
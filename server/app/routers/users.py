@@ -1,110 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordBearer
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from app import crud, models, schemas
-from app.database import get_db
-import logging
+from typing import List, Optional
+from app import auth, crud, passwords, schemas
+from app.compression import uncompressed
+from app.database import DbSession, get_db, run_db
+from app.pagination import cursor_param, set_next_cursor
+from app.projection import Projection, projection_adapter, projection_param
+from app.ratelimit import login_limit
+from app.responses import orm_response, type_adapter
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Configuration - move these to your config file
-SECRET_KEY = "your-secret-key-here"  # Change this to a secure secret key
-ALGORITHM = "HS256"
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 security = HTTPBearer()
 router = APIRouter(prefix="/users", tags=["users"])
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password checks in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def invalid_token():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def user_claims(claims: dict) -> dict:
+    return {"id": claims["user_id"], "email": claims.get("sub"), "name": claims.get("name")}
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = crud.get_user_by_email(db, email=email)
+async def authenticate_user(db: DbSession, email: str, password: str):
+    user = await run_db(db, crud.get_user_by_email, email=email)
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    try:
+        valid, new_hash = await passwords.verify_password(password, user.password_hash)
+    except passwords.PasswordPoolBusy:
+        raise password_pool_busy()
+    if not valid:
         return False
+    if new_hash:
+        await run_db(db, crud.update_user_password_hash, user_id=user.id, password_hash=new_hash)
     return user
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    logger.info("verify_token function called")
-    print("verify1 - Token verification started")
-    
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Claims of a valid access token; served from the token cache after the first check"""
     try:
-        logger.info(f"Token received: {credentials.credentials[:20]}...")
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email: str = payload.get("sub")  # Based on your login, sub contains email
-        user_id: int = payload.get("user_id")  # Get user_id from payload
-        
-        logger.info(f"Decoded payload: user_email={user_email}, user_id={user_id}")
-        
-        if user_id is None:
-            logger.error("user_id not found in token payload")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token - no user_id"
-            )
-        return user_id
-        
-    except JWTError as e:  # Fixed: Use JWTError instead of jwt.PyJWTError
-        logger.error(f"JWT Error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
-    except Exception as e:
-        logger.error(f"Unexpected error in verify_token: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token verification failed"
-        )
+        return auth.decode_token(credentials.credentials, auth.ACCESS)
+    except auth.InvalidToken:
+        raise invalid_token()
 
 @router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: DbSession = Depends(get_db)):
+    db_user = await run_db(db, crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    try:
+        password_hash = await passwords.hash_password(user.password)
+    except passwords.PasswordPoolBusy:
+        raise password_pool_busy()
+    return await run_db(db, crud.create_user, user=user, password_hash=password_hash)
 
-@router.post("/login")
-def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+@router.post("/login", dependencies=[Depends(login_limit)])
+@uncompressed  # tokens next to the echoed email: no compression oracle (BREACH)
+async def login(user_credentials: schemas.UserLogin, db: DbSession = Depends(get_db)):
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
+        auth.log_event("login_failed", sampled=False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id}, 
-        expires_delta=access_token_expires
-    )
+    auth.log_event("login", user_id=user.id)
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **auth.create_token_pair(user),
         "user": {
             "id": user.id,
             "email": user.email,
@@ -112,37 +84,46 @@ def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
         }
     }
 
-@router.get("/verify")
-def verify_user_token(user_id: int , db: Session = Depends(get_db)):
-    print("this")
-    logger.info(f"verify_user_token endpoint called with user_id: {user_id}")
-    print(f"verify - Processing user_id: {user_id}")
-    
+@router.post("/refresh")
+@uncompressed
+async def refresh_token(body: schemas.TokenRefresh, db: DbSession = Depends(get_db)):
+    """Exchange a refresh token for a new token pair"""
     try:
-        db_user = crud.get_user(db, user_id=user_id)
-        
-        if not db_user:
-            logger.error(f"User not found for user_id: {user_id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        logger.info(f"User verified successfully: {db_user.email}")
-        return {"valid": True, "user": {"id": db_user.id, "email": db_user.email, "name": db_user.name}}
-        
-    except Exception as e:
-        logger.error(f"Error in verify_user_token: {str(e)}")
-        raise
+        claims = auth.decode_token(body.refresh_token, auth.REFRESH)
+    except auth.InvalidToken:
+        raise invalid_token()
+    # Refreshing is rare, so this is where deleted users lose access
+    user = await run_db(db, crud.get_user, user_id=claims["user_id"])
+    if not user:
+        raise invalid_token()
+    return {
+        **auth.create_token_pair(user),
+        "user": {"id": user.id, "email": user.email, "name": user.name}
+    }
+
+@router.get("/verify")
+async def verify_user_token(claims: dict = Depends(verify_token)):
+    """Identity of the bearer, read from the token claims without a database lookup"""
+    return {"valid": True, "user": user_claims(claims)}
 
 @router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+async def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[list] = Depends(cursor_param(int)),
+    projection: Optional[Projection] = Depends(projection_param(schemas.User)),
+    db: DbSession = Depends(get_db)
+):
+    users = await run_db(db, crud.get_users, skip=skip, limit=limit, after=after, projection=projection)
+    set_next_cursor(response, users, limit, "id")
+    if projection is not None:
+        return orm_response(projection_adapter(schemas.User, projection), users, response)
+    return orm_response(type_adapter(List[schemas.User]), users, response)
 
 @router.get("/{user_id}", response_model=schemas.User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+async def read_user(user_id: int, db: DbSession = Depends(get_db)):
+    db_user = await run_db(db, crud.get_user, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
\ No newline at end of file
+    return orm_response(type_adapter(schemas.User), db_user)
\ No newline at end of file
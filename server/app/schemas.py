@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Generic, Optional, List, TypeVar
 from datetime import datetime
 
 
@@ -22,6 +22,9 @@ class UserResponse(UserBase):
 class UserLogin(BaseModel):
     email: str
     password: str
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
     
 class User(UserBase):
     id: int
@@ -119,6 +122,19 @@ class Project(ProjectBase):
         from_attributes = True
 
 
+class ProjectTreeSection(BaseModel):
+    id: Optional[int] = None  # Set to keep (and update) an existing section
+    title: str
+    description: Optional[str] = None
+    details: Optional[str] = None
+    main_image_url: Optional[str] = None
+
+
+class ProjectTree(ProjectBase):
+    # The complete section list; stored sections left out are deleted
+    sections: List[ProjectTreeSection] = []
+
+
 class EventBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -145,6 +161,7 @@ class EventUpdate(BaseModel):
 
 class Event(EventBase):
     id: int
+    starts_at: Optional[datetime] = None  # None when date is not YYYY-MM-DD
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -165,6 +182,11 @@ class OrderHistoryCreate(OrderHistoryBase):
     pass
 
 
+class OrderAccepted(BaseModel):
+    reference: str
+    status: str  # "queued", or "written" once the order is in orders_history
+
+
 class OrderHistoryUpdate(BaseModel):
     full_name: Optional[str] = None
     email: Optional[str] = None
@@ -177,11 +199,74 @@ class OrderHistoryUpdate(BaseModel):
 class OrderHistory(OrderHistoryBase):
     id: int  # Represents 'order_id'
     order_date: datetime
+    reference: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+ItemT = TypeVar("ItemT")
+
+
+class ProductBulkUpdate(ProductUpdate):
+    id: int
+
+
+class ProjectSectionBulkUpdate(ProjectSectionUpdate):
+    id: int
+
+
+class EventBulkUpdate(EventUpdate):
+    id: int
+
+
+class ImageUpload(BaseModel):
+    id: str  # Content hash
+    url: str  # The original, as uploaded
+    variants: Dict[int, str] = {}  # WebP URL by width; empty without Pillow
+
+
+class BulkItemError(BaseModel):
+    index: int  # Position of the item in the request array
+    id: Optional[int] = None
+    detail: Any
+
+
+class BulkResult(BaseModel, Generic[ItemT]):
+    items: List[ItemT] = []
+    errors: List[BulkItemError] = []
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: List[int] = []
+    errors: List[BulkItemError] = []
+
+
+class OrderStatsGroup(BaseModel):
+    key: str  # Product title, customer email or bucket start date
+    order_count: int
+    quantity: int
+    total_amount: float
+
+
+class OrderStats(BaseModel):
+    group_by: Optional[str] = None
+    order_count: int
+    quantity: int
+    total_amount: float
+    groups: List[OrderStatsGroup] = []
+    source: str  # "orders" or "rollup"
+
+
+class SearchHit(BaseModel):
+    kind: str  # project, section, event or product
+    id: int
+    parent_id: Optional[int] = None  # Project of a section
+    title: str
+    snippet: str  # Matched text with <mark> highlights
+    score: float
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
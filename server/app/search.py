@@ -0,0 +1,177 @@
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app import models
+
+# What gets indexed per kind: (model, title attribute, body attributes, parent attribute)
+SEARCH_FIELDS = {
+    "project": (models.Project, "name", ("description", "overview"), None),
+    "section": (models.ProjectSection, "title", ("description", "details"), "project_id"),
+    "event": (models.Events, "title", ("description", "location"), None),
+    "product": (models.Product, "name", ("description",), None),
+}
+# Kinds stored in the history database; the rest live in the primary one
+HISTORY_KINDS = {"product"}
+# FTS5 rows are addressed by rowid = ref_id * 8 + code, so single documents
+# can be replaced or dropped without scanning the index
+KIND_CODES = {"project": 1, "section": 2, "event": 3, "product": 4}
+
+SNIPPET_START, SNIPPET_STOP = "<mark>", "</mark>"
+
+POSTGRES_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS search_documents (
+        kind VARCHAR NOT NULL,
+        ref_id INTEGER NOT NULL,
+        parent_id INTEGER,
+        title TEXT NOT NULL,
+        body TEXT NOT NULL,
+        document TSVECTOR NOT NULL,
+        PRIMARY KEY (kind, ref_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_document ON search_documents USING GIN (document)",
+]
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_documents USING fts5(
+        kind UNINDEXED, ref_id UNINDEXED, parent_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61'
+    )""",
+]
+
+
+def _dialect(db) -> str:
+    return db.get_bind().dialect.name
+
+
+def create_search_schema(conn):
+    """Create the search table for the connection's dialect if it is missing."""
+    statements = POSTGRES_SCHEMA if conn.dialect.name == "postgresql" else SQLITE_SCHEMA
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _rowid(kind: str, ref_id: int) -> int:
+    return ref_id * 8 + KIND_CODES[kind]
+
+
+def _document(kind: str, row) -> dict:
+    _, title_attr, body_attrs, parent_attr = SEARCH_FIELDS[kind]
+    return {
+        "rowid": _rowid(kind, row.id),
+        "kind": kind,
+        "ref_id": row.id,
+        "parent_id": getattr(row, parent_attr) if parent_attr else None,
+        "title": getattr(row, title_attr) or "",
+        "body": "\n".join(filter(None, (getattr(row, attr) for attr in body_attrs))),
+    }
+
+
+def index_rows(db: Session, kind: str, rows: Iterable):
+    """
+    (Re)index rows of one kind inside the caller's transaction.
+
+    `rows` may be ORM objects or Row results; only the indexed columns and id
+    are read. Call before commit so the index changes with the data.
+    """
+    documents = [_document(kind, row) for row in rows]
+    if not documents:
+        return
+    if _dialect(db) == "postgresql":
+        db.execute(text(
+            """INSERT INTO search_documents (kind, ref_id, parent_id, title, body, document)
+            VALUES (:kind, :ref_id, :parent_id, :title, :body,
+                    setweight(to_tsvector('english', :title), 'A') ||
+                    setweight(to_tsvector('english', :body), 'B'))
+            ON CONFLICT (kind, ref_id) DO UPDATE SET
+                parent_id = EXCLUDED.parent_id, title = EXCLUDED.title,
+                body = EXCLUDED.body, document = EXCLUDED.document"""), documents)
+    else:
+        remove_documents(db, kind, [d["ref_id"] for d in documents])
+        db.execute(text(
+            """INSERT INTO search_documents (rowid, kind, ref_id, parent_id, title, body)
+            VALUES (:rowid, :kind, :ref_id, :parent_id, :title, :body)"""), documents)
+
+
+def remove_documents(db: Session, kind: str, ref_ids: List[int]):
+    if not ref_ids:
+        return
+    if _dialect(db) == "postgresql":
+        statement = text("DELETE FROM search_documents WHERE kind = :kind AND ref_id IN :ids")
+        params = {"kind": kind, "ids": list(ref_ids)}
+    else:
+        statement = text("DELETE FROM search_documents WHERE rowid IN :ids")
+        params = {"ids": [_rowid(kind, ref_id) for ref_id in ref_ids]}
+    db.execute(statement.bindparams(bindparam("ids", expanding=True)), params)
+
+
+def remove_children(db: Session, kind: str, parent_ids: List[int]):
+    """Drop documents whose parent (e.g. the project of a section) was deleted."""
+    if not parent_ids:
+        return
+    statement = text("DELETE FROM search_documents WHERE kind = :kind AND parent_id IN :ids")
+    db.execute(statement.bindparams(bindparam("ids", expanding=True)),
+               {"kind": kind, "ids": list(parent_ids)})
+
+
+def rebuild(db: Session, kinds: Iterable[str]) -> int:
+    """Reindex every row of the given kinds from their tables; returns the document count."""
+    count = 0
+    for kind in kinds:
+        db.execute(text("DELETE FROM search_documents WHERE kind = :kind"), {"kind": kind})
+        rows = db.query(SEARCH_FIELDS[kind][0]).all()
+        index_rows(db, kind, rows)
+        count += len(rows)
+    db.commit()
+    return count
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    # Quote every term so user input cannot use FTS5 operators; prefix-match the last one
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search(db: Session, query: str, kinds: Iterable[str], limit: int = 20) -> List[dict]:
+    """Ranked matches of `query` among documents of `kinds`, best first, with highlighted snippets."""
+    kinds = list(kinds)
+    if not kinds or not query.strip():
+        return []
+    params = {"query": query, "limit": limit, **{f"kind_{i}": k for i, k in enumerate(kinds)}}
+    kind_list = ", ".join(f":kind_{i}" for i in range(len(kinds)))
+
+    if _dialect(db) == "postgresql":
+        statement = text(
+            f"""SELECT kind, ref_id, parent_id, title,
+                ts_headline('english',
+                    CASE WHEN to_tsvector('english', body) @@ q THEN body ELSE title END, q,
+                    'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=24, MinWords=8') AS snippet,
+                ts_rank_cd(document, q) AS score
+            FROM search_documents, websearch_to_tsquery('english', :query) AS q
+            WHERE document @@ q AND kind IN ({kind_list})
+            ORDER BY score DESC LIMIT :limit""")
+    else:
+        params["query"] = _fts5_query(query)
+        if params["query"] is None:
+            return []
+        # bm25 is lower-is-better; weight title matches above body matches.
+        # Column -1 lets FTS5 take the snippet from whichever of title and
+        # body matched, so title-only matches are not left without one
+        statement = text(
+            f"""SELECT kind, ref_id, parent_id, title,
+                snippet(search_documents, -1, '{SNIPPET_START}', '{SNIPPET_STOP}', '…', 16) AS snippet,
+                -bm25(search_documents, 0, 0, 0, 10.0, 1.0) AS score
+            FROM search_documents
+            WHERE search_documents MATCH :query AND kind IN ({kind_list})
+            ORDER BY score DESC LIMIT :limit""")
+    return [
+        {"kind": row.kind, "id": int(row.ref_id),
+         "parent_id": int(row.parent_id) if row.parent_id is not None else None,
+         "title": row.title, "snippet": row.snippet, "score": float(row.score)}
+        for row in db.execute(statement, params)
+    ]
@@ -0,0 +1 @@
+"""Seeded load tests for the API; see benchmarks/run.py."""
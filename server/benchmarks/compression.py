@@ -0,0 +1,88 @@
+"""
+CPU cost against bytes saved for compressing a /projects listing page.
+
+    python -m benchmarks.compression --rows 100 --sections 4
+
+Each gzip level and brotli quality is timed on the same JSON body the
+listing endpoint renders; "cached" is the lookup CompressionMiddleware does
+instead when the response's ETag was compressed before. Text fields are
+drawn from a Zipf-distributed vocabulary of made-up words, which
+compresses somewhat worse than real English prose.
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import timeit
+from datetime import datetime
+from typing import List
+
+
+def build_rows(count: int, sections: int, seed: int = 0):
+    from app import models
+
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(3000)]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    def text(words: int) -> str:
+        return " ".join(rng.choices(vocabulary, weights, k=words))
+
+    now = datetime.utcnow()
+    return [
+        models.Project(
+            id=i, name=text(3), description=text(30), overview=text(60),
+            main_image_url=f"https://img.bench.local/p{i}.jpg", status="ongoing",
+            created_at=now, updated_at=now,
+            sections=[models.ProjectSection(
+                id=i * sections + s, project_id=i, title=text(4), description=text(15),
+                details=text(150), main_image_url=None, created_at=now, updated_at=None)
+                for s in range(sections)])
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # Importing the app builds its settings; keep them away from .env databases
+    workdir = tempfile.mkdtemp(prefix="iiec-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["HISTORY_DATABASE_URL"] = f"sqlite:///{workdir}/bench_history.db"
+
+    from app import schemas
+    from app.compression import CompressedBodies, brotli, compress
+    from app.config import settings
+    from app.responses import orm_response, type_adapter
+
+    body = orm_response(type_adapter(List[schemas.Project]), build_rows(args.rows, args.sections)).body
+    variants = [("gzip", "COMPRESSION_GZIP_LEVEL", level) for level in (1, 5, 6, 9)]
+    if brotli is not None:
+        variants += [("br", "COMPRESSION_BROTLI_QUALITY", quality) for quality in (1, 4, 5, 9, 11)]
+    else:
+        print("brotli is not installed; gzip only")
+
+    print(f"{args.rows} projects x {args.sections} sections: {len(body) / 1024:.1f} KiB of JSON")
+    print(f"{'encoding':<10} {'level':>5} {'ms/call':>9} {'MB/s':>8} {'KiB out':>9} {'saved':>7}")
+    for encoding, setting, level in variants:
+        setattr(settings, setting, level)
+        number = max(1, args.repeat // (10 if level >= 9 else 1))
+        per_call = min(timeit.repeat(lambda: compress(body, encoding), number=number, repeat=5)) / number
+        size = len(compress(body, encoding))
+        print(f"{encoding:<10} {level:>5} {per_call * 1000:>9.3f} {len(body) / per_call / 1e6:>8.1f} "
+              f"{size / 1024:>9.1f} {1 - size / len(body):>7.1%}")
+
+    cache = CompressedBodies(1024 * 1024)
+    key = ('W/"etag"', "gzip", len(body))
+    cache.put(key, compress(body, "gzip"))
+    per_call = min(timeit.repeat(lambda: cache.get(key), number=10_000, repeat=5)) / 10_000
+    print(f"{'cached':<10} {'':>5} {per_call * 1000:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
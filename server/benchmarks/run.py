@@ -0,0 +1,212 @@
+"""
+Load-test the API and compare the results with a stored baseline.
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale small --save-baseline
+    python -m benchmarks.run --url http://localhost:8080 --scale small --read-only
+
+Without --url the app is served in process through an ASGI transport,
+against fresh SQLite databases in a temporary directory (or the ones given
+with --database-url / --history-database-url) seeded at --scale. With --url
+an already running server is load-tested; seed its databases first with
+benchmarks.seed at the same scale.
+
+Each scenario is sent --requests times by --concurrency concurrent clients.
+Queries per request and DB time come from the Server-Timing header, so a
+streamed response only counts the queries run before its first byte. The run
+exits with status 1 when a scenario's p95 latency grew by more than
+--tolerance over the baseline, or when it runs more queries than before.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.scenarios import SCENARIOS, Context, Scenario
+from benchmarks.seed import PASSWORD, SCALES
+
+BASELINE = Path(__file__).with_name("baseline.json")
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: Context,
+                       requests: int, concurrency: int) -> dict:
+    latencies, queries, db_ms = [], [], []
+    errors = 0
+    remaining = iter(range(requests))
+    headers = {"Authorization": f"Bearer {ctx.token}"} if scenario.auth else {}
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            path = scenario.path(ctx)
+            body = scenario.body(ctx) if scenario.body else None
+            started = time.perf_counter()
+            response = await client.request(scenario.method, path, json=body, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+            timing = SERVER_TIMING_DB.search(response.headers.get("server-timing", ""))
+            if timing:
+                db_ms.append(float(timing.group(1)))
+                queries.append(int(timing.group(2)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+        "db_ms_per_request": round(sum(db_ms) / len(db_ms), 2) if db_ms else None,
+    }
+
+
+async def run(args, counts: dict) -> dict:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        app = None
+    else:
+        from app.main import app
+        # ASGITransport does not send lifespan events, so run startup here
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    ctx = Context(counts=counts, rng=random.Random(args.seed))
+    results = {}
+    try:
+        login = await client.post("/users/login", json={"email": "user1@bench.local", "password": PASSWORD})
+        login.raise_for_status()
+        ctx.token = login.json()["access_token"]
+        for scenario in SCENARIOS:
+            if args.only and not any(scenario.name.startswith(prefix) for prefix in args.only):
+                continue
+            if args.read_only and scenario.writes:
+                continue
+            # A few unmeasured requests first, so caches and pools are warm
+            await run_scenario(client, scenario, ctx, min(args.concurrency, args.requests), args.concurrency)
+            results[scenario.name] = await run_scenario(client, scenario, ctx, args.requests, args.concurrency)
+            print(format_row(scenario.name, results[scenario.name]), flush=True)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+    return results
+
+
+def format_row(name: str, result: dict) -> str:
+    queries = result["queries_per_request"]
+    return (f"{name:<20} {result['requests']:>6} {result['errors']:>6} {result['throughput_rps']:>9} "
+            f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} "
+            f"{'-' if queries is None else queries:>8}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of `results` against a baseline run, one message each."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if (result["queries_per_request"] or 0) > (before["queries_per_request"] or 0):
+            regressions.append(
+                f"{name}: queries/request {before['queries_per_request']} -> {result['queries_per_request']}")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="scenario name prefixes to run, e.g. projects orders.list")
+    parser.add_argument("--read-only", action="store_true", help="skip scenarios that write")
+    parser.add_argument("--url", help="load-test a running server instead of the in-process app")
+    parser.add_argument("--database-url", help="primary database for the in-process app")
+    parser.add_argument("--history-database-url", help="history database for the in-process app")
+    parser.add_argument("--no-seed", action="store_true", help="reuse already seeded databases")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=str(BASELINE), help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed relative p95 growth over the baseline (default 0.5)")
+    args = parser.parse_args()
+
+    if not args.url:
+        # Never fall back to DATABASE_URL from .env: seeding deletes existing rows
+        workdir = tempfile.mkdtemp(prefix="iiec-bench-")
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+        os.environ["HISTORY_DATABASE_URL"] = args.history_database_url or f"sqlite:///{workdir}/bench_history.db"
+        # Every request comes from the one in-process client; measure the
+        # endpoints rather than their per-client rate limits
+        os.environ.setdefault("RATE_LIMIT_LOGIN", "")
+        os.environ.setdefault("RATE_LIMIT_ORDERS", "")
+        if not args.no_seed:
+            from benchmarks.seed import seed
+            started = time.perf_counter()
+            seed(args.scale, args.seed)
+            print(f"seeded {args.scale} fixtures in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'scenario':<20} {'reqs':>6} {'errors':>6} {'req/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    results = asyncio.run(run(args, SCALES[args.scale]))
+    report = {
+        "scale": args.scale,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "async_db": os.getenv("ASYNC_DB", "False").lower() == "true",
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        return
+    baseline = json.loads(baseline_path.read_text())
+    if (baseline.get("scale"), baseline.get("concurrency")) != (args.scale, args.concurrency):
+        print(f"baseline was recorded at scale={baseline.get('scale')} "
+              f"concurrency={baseline.get('concurrency')}; not comparing")
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nregressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nno regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Requests the benchmark runner sends, covering every router in app/routers."""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+
+@dataclass
+class Context:
+    """What scenarios may refer to: fixture counts and an access token."""
+    counts: dict
+    rng: random.Random
+    token: Optional[str] = None
+
+    def pick(self, kind: str) -> int:
+        return self.rng.randint(1, self.counts[kind])
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[Context], str]
+    body: Optional[Callable[[Context], dict]] = None
+    auth: bool = False
+    # Writes are excluded with --read-only, e.g. against a shared staging database
+    writes: bool = False
+
+
+def _order(ctx: Context) -> dict:
+    quantity = ctx.rng.randint(1, 4)
+    return {"full_name": "Bench Customer", "email": "bench@bench.local", "contact": "9800000000",
+            "product_title": f"Tee {ctx.pick('products')}", "quantity": quantity,
+            "total_amount": quantity * 10.0}
+
+
+def _day_window(ctx: Context) -> str:
+    # One day of the year of seeded orders
+    start = datetime.utcnow().date() - timedelta(days=ctx.rng.randint(1, 364))
+    return f"start={start.isoformat()}T00:00:00&end={(start + timedelta(days=1)).isoformat()}T00:00:00"
+
+
+SCENARIOS = [
+    Scenario("projects.list", "GET", lambda ctx: "/projects/?limit=100"),
+    Scenario("projects.grid", "GET", lambda ctx: "/projects/?limit=100&fields=name,status,main_image_url"),
+    Scenario("projects.get", "GET", lambda ctx: f"/projects/{ctx.pick('projects')}"),
+    Scenario("projects.sections", "GET", lambda ctx: f"/projects/{ctx.pick('projects')}/sections"),
+    Scenario("events.list", "GET", lambda ctx: "/events/?limit=100"),
+    Scenario("events.upcoming", "GET", lambda ctx: "/events/?upcoming=true&sort=date&limit=6"),
+    Scenario("events.get", "GET", lambda ctx: f"/events/{ctx.pick('events')}"),
+    Scenario("products.list", "GET", lambda ctx: "/products/?limit=100"),
+    Scenario("products.get", "GET", lambda ctx: f"/products/{ctx.pick('products')}"),
+    Scenario("orders.list", "GET", lambda ctx: "/orders/?limit=100"),
+    Scenario("orders.get", "GET", lambda ctx: f"/orders/{ctx.pick('orders')}"),
+    Scenario("orders.stats", "GET", lambda ctx: "/orders/stats?group_by=day"),
+    Scenario("orders.export", "GET", lambda ctx: "/orders/export?format=ndjson&" + _day_window(ctx)),
+    Scenario("orders.create", "POST", lambda ctx: "/orders/", body=_order, writes=True),
+    Scenario("search", "GET", lambda ctx: "/search/?q=" + ctx.rng.choice(("rover", "solar", "robot", "tee"))),
+    Scenario("users.list", "GET", lambda ctx: "/users/"),
+    Scenario("users.get", "GET", lambda ctx: f"/users/{ctx.pick('users')}"),
+    Scenario("users.verify", "GET", lambda ctx: "/users/verify", auth=True),
+    Scenario("users.login", "POST", lambda ctx: "/users/login",
+             body=lambda ctx: {"email": f"user{ctx.pick('users')}@bench.local", "password": "benchmark"}),
+    Scenario("metrics.pool", "GET", lambda ctx: "/metrics/pool"),
+    Scenario("root", "GET", lambda ctx: "/"),
+]
@@ -0,0 +1,153 @@
+"""
+Fill the primary and history databases with benchmark fixtures.
+
+    python -m benchmarks.seed --scale small \
+        --database-url sqlite:///./bench.db --history-database-url sqlite:///./bench_history.db
+
+    python -m benchmarks.seed --scale large \
+        --database-url postgresql://bench@localhost/iiec_bench \
+        --history-database-url postgresql://bench@localhost/iiec_bench_history
+
+Both SQLite and PostgreSQL work. Existing rows in the seeded tables are
+deleted first, so the URLs must be given explicitly rather than read from
+.env.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, text
+
+# Row counts per scale. "large" is the size we plan for on event day.
+SCALES = {
+    "tiny": {"users": 3, "projects": 50, "sections_per_project": 4, "events": 50,
+             "products": 20, "orders": 2_000},
+    "small": {"users": 5, "projects": 500, "sections_per_project": 4, "events": 300,
+              "products": 100, "orders": 50_000},
+    "medium": {"users": 10, "projects": 2_000, "sections_per_project": 5, "events": 1_000,
+               "products": 300, "orders": 250_000},
+    "large": {"users": 20, "projects": 10_000, "sections_per_project": 5, "events": 5_000,
+              "products": 1_000, "orders": 1_000_000},
+}
+
+BATCH_SIZE = 10_000
+PASSWORD = "benchmark"
+WORDS = ("solar", "rover", "drone", "robot", "sensor", "arduino", "circuit", "hackathon",
+         "workshop", "design", "startup", "energy", "vision", "network", "launch", "tee")
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[start:start + BATCH_SIZE])
+    _reset_sequence(conn, table)
+
+
+def _reset_sequence(conn, table):
+    # Rows are inserted with explicit ids; move PostgreSQL's serial past them
+    # so rows created during the benchmark do not collide
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"))
+
+
+def seed(scale: str = "small", seed: int = 0) -> dict:
+    """Replace the benchmark tables' contents with fixtures of the given scale."""
+    # Imported here so callers can point the app at the benchmark databases first
+    from app import crud, models, search
+    from app.config import settings
+    from app.database import SessionLocal, SessionLocalHistory, engine, engine_history
+    from app.event_dates import event_start
+    from app.main import on_startup
+    from app.passwords import password_context
+
+    counts = SCALES[scale]
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    on_startup()
+
+    with engine.begin() as conn:
+        for model in (models.ProjectSection, models.Project, models.Events, models.User):
+            conn.execute(delete(model))
+        # One hash for every user keeps seeding fast at any bcrypt cost
+        password_hash = password_context().hash(PASSWORD)
+        _insert(conn, models.User.__table__, [
+            {"id": i, "email": f"user{i}@bench.local", "name": f"User {i}", "password_hash": password_hash}
+            for i in range(1, counts["users"] + 1)])
+        _insert(conn, models.Project.__table__, [
+            {"id": i, "name": f"{_text(rng, 2).title()} {i}", "description": _text(rng, 20),
+             "overview": _text(rng, 40), "main_image_url": f"https://img.bench.local/p{i}.jpg",
+             "status": rng.choice(("upcoming", "ongoing", "completed"))}
+            for i in range(1, counts["projects"] + 1)])
+        per_project = counts["sections_per_project"]
+        _insert(conn, models.ProjectSection.__table__, [
+            {"id": (p - 1) * per_project + s, "project_id": p, "title": f"Section {s}",
+             "description": _text(rng, 10), "details": _text(rng, 150),
+             "main_image_url": f"https://img.bench.local/s{p}-{s}.jpg"}
+            for p in range(1, counts["projects"] + 1) for s in range(1, per_project + 1)])
+        events = []
+        for i in range(1, counts["events"] + 1):
+            day = (now + timedelta(days=rng.randint(-365, 365))).strftime("%Y-%m-%d")
+            start = f"{rng.randint(8, 18):02d}:00"
+            events.append({
+                "id": i, "title": f"{_text(rng, 2).title()} {i}", "description": _text(rng, 30),
+                "date": day, "time": start, "starts_at": event_start(day, start),
+                "location": rng.choice(("Hall A", "Robotics lab", "Online")),
+                "url": f"https://bench.local/e{i}", "imageUrl": f"https://img.bench.local/e{i}.jpg"})
+        _insert(conn, models.Events.__table__, events)
+
+    titles = [f"{_text(rng, 1).title()} Tee {i}" for i in range(1, counts["products"] + 1)]
+    with engine_history.begin() as conn:
+        for model in (models.OrderDailyRollup, models.OrderHistory, models.Product):
+            conn.execute(delete(model))
+        _insert(conn, models.Product.__table__, [
+            {"id": i, "name": title, "description": _text(rng, 15), "price": float(rng.randint(5, 50)),
+             "image": f"https://img.bench.local/t{i}.jpg", "in_stock": rng.random() > 0.1}
+            for i, title in enumerate(titles, start=1)])
+        # Orders are spread over the past year, oldest first
+        span = 365 * 24 * 3600
+        for start in range(0, counts["orders"], BATCH_SIZE):
+            rows = []
+            for i in range(start + 1, min(start + BATCH_SIZE, counts["orders"]) + 1):
+                quantity = rng.randint(1, 4)
+                rows.append({
+                    "id": i, "full_name": f"Customer {i % 5000}", "email": f"c{i % 5000}@bench.local",
+                    "contact": f"98{i:08d}", "product_title": rng.choice(titles), "quantity": quantity,
+                    "total_amount": quantity * 10.0,
+                    "order_date": now - timedelta(seconds=span - span * i // counts["orders"]),
+                })
+            conn.execute(models.OrderHistory.__table__.insert(), rows)
+        _reset_sequence(conn, models.OrderHistory.__table__)
+
+    with SessionLocal() as db:
+        search.rebuild(db, [kind for kind in search.SEARCH_FIELDS if kind not in search.HISTORY_KINDS])
+    with SessionLocalHistory() as db:
+        search.rebuild(db, search.HISTORY_KINDS)
+        if settings.ORDER_ROLLUPS:
+            crud.rebuild_order_rollups(db)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for generated values")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--history-database-url", required=True)
+    args = parser.parse_args()
+    # Must be set before app.config is first imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["HISTORY_DATABASE_URL"] = args.history_database_url
+    started = time.perf_counter()
+    counts = seed(args.scale, args.seed)
+    print(f"seeded {args.scale} fixtures in {time.perf_counter() - started:.1f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
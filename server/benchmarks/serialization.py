@@ -0,0 +1,82 @@
+"""
+Compare response serialization paths for a page of listing rows.
+
+    python -m benchmarks.serialization --rows 100 --sections 4
+
+"response_model" is what FastAPI does for a route returning ORM objects or
+dicts with a response_model: validate, dump to Python, encode with json.
+"orm_response" and "json_response" are the paths in app/responses.py, for
+ORM rows and for already JSON-ready (cached) dicts respectively.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import timeit
+from datetime import datetime
+from typing import List
+
+
+def build_rows(count: int, sections: int):
+    from app import models
+
+    now = datetime.utcnow()
+    return [
+        models.Project(
+            id=i, name=f"Project {i}", description="d" * 200, overview="o" * 400,
+            main_image_url=f"https://img.bench.local/p{i}.jpg", status="ongoing",
+            created_at=now, updated_at=now,
+            sections=[models.ProjectSection(
+                id=i * sections + s, project_id=i, title=f"Section {s}", description="d" * 100,
+                details="x" * 1000, main_image_url=None, created_at=now, updated_at=None)
+                for s in range(sections)])
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # Importing the app builds its engines; keep them away from .env databases
+    workdir = tempfile.mkdtemp(prefix="iiec-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["HISTORY_DATABASE_URL"] = f"sqlite:///{workdir}/bench_history.db"
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app import schemas
+    from app.responses import json_response, orjson, orm_response, type_adapter
+
+    rows = build_rows(args.rows, args.sections)
+    adapter = type_adapter(List[schemas.Project])
+    cached = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+    field = create_response_field(name="response", type_=List[schemas.Project], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def response_model(content):
+        return JSONResponse(loop.run_until_complete(serialize_response(field=field, response_content=content))).body
+
+    paths = {
+        "response_model (ORM rows)": lambda: response_model(rows),
+        "orm_response (ORM rows)": lambda: orm_response(adapter, rows).body,
+        "response_model (cached dicts)": lambda: response_model(cached),
+        "json_response (cached dicts)": lambda: json_response(cached).body,
+    }
+    print(f"{args.rows} projects x {args.sections} sections, orjson {'on' if orjson else 'off'}")
+    baseline = None
+    for name, fn in paths.items():
+        fn()  # warm up
+        per_call = min(timeit.repeat(fn, number=args.repeat // 10 or 1, repeat=10)) / (args.repeat // 10 or 1)
+        baseline = baseline or per_call
+        print(f"{name:<32} {per_call * 1000:8.3f} ms  {baseline / per_call:5.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
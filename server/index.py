@@ -1,4 +1,13 @@
 # index.py - Vercel entry point
+import os
+
+# Serverless cold starts: import routers on demand, and check (and apply)
+# migrations on the first database use instead of at startup
+os.environ.setdefault("LAZY_STARTUP", "True")
+# Vercel's edge sets x-forwarded-for to the real client address; without it
+# every visitor would share the rate limit bucket of the proxy
+os.environ.setdefault("RATE_LIMIT_CLIENT_HEADER", "x-forwarded-for")
+
 from app.main import app
 
 # This exports the FastAPI app for Vercel